@@ -1,5 +1,5 @@
 # Agentic tool dispatcher integration
-from extension.orchestrator import handle_agent_task
+from extension.orchestrator import Orchestrator, handle_agent_task, handle_agent_tasks
 
 class ToolCallingAgent:
     """Agent that receives task specs and calls document tools."""
@@ -12,55 +12,32 @@ class ToolCallingAgent:
         Returns result dict from handle_agent_task.
         """
         return handle_agent_task(task_spec)
+
+    def perform_tasks(self, task_specs):
+        """
+        task_specs: list of task_spec dicts, applied as a single batch
+        Returns a list of result dicts, one per task.
+        """
+        return handle_agent_tasks(task_specs)
 """
 Tool-Calling Agent: Receives task specs, performs edits, handles retries, returns results.
 """
-from extension.tools import document_tools
-
-
-import logging
-from extension.tools import document_tools
-
 from typing import Dict
 
 class ToolAgent:
+    """Runs task specs through Orchestrator.run_task; kept for callers of the old interface."""
+    def __init__(self, orchestrator=None):
+        self._orchestrator = orchestrator
+
     def perform_edit_task(self, task_spec: Dict) -> Dict:
         """
-        Receives a task specification, performs the requested edits (with retries if needed),
+        Receives a task specification, lets the model perform the requested edits in an agent loop,
         and returns a result dict with status, any errors, and a summary of changes.
         """
-        log = []
-        errors = []
-        status = "failure"
-        summary = ""
-        max_retries = task_spec.get("constraints", {}).get("max_retries", 3)
-        for attempt in range(1, max_retries + 1):
-            try:
-                # Example: parse description and call tool functions
-                desc = task_spec.get("description", "")
-                ctx = task_spec.get("document_context", {})
-                # This is a placeholder: real implementation would parse desc and call tools
-                # For demo, just call a sample tool
-                if "bold" in desc.lower():
-                    # Example: apply bold to first paragraph
-                    ok = document_tools.set_bold(0, 10, True)
-                    log.append("Applied bold to first 10 chars.")
-                    if not ok:
-                        raise Exception("Failed to apply bold.")
-                status = "success"
-                summary = "Task executed successfully."
-                break
-            except Exception as e:
-                errors.append(str(e))
-                log.append(f"Attempt {attempt} failed: {e}")
-        else:
-            summary = "Task failed after retries."
-        return {
-            "status": status,
-            "summary": summary,
-            "errors": errors,
-            "log": log
-        }
+        if self._orchestrator is None:
+            # Built on first use so creating the agent does not read config.json
+            self._orchestrator = Orchestrator()
+        return self._orchestrator.run_task(task_spec)
 
     def execute_task(self, task_spec):
         # Backward compatibility: call perform_edit_task
@@ -3,10 +3,12 @@ Agentic tool registry and dispatcher for LibreOffice AI extension.
 Wraps document_tools.py functions as LangChain tools and exposes a dispatcher for agentic calls.
 """
 
+import importlib
+import inspect
 import logging
+import typing
+from collections.abc import Mapping
 from functools import partial, wraps
-from langchain.tools import Tool
-import extension.tools.document_tools as doc_tools
 
 # Configure logging
 logger = logging.getLogger("agentic_tools")
@@ -43,8 +45,13 @@ def safe_tool_call(func):
             raise
     return wrapper
 
+def _document_tools():
+    # Imported on first use: document_tools pulls in the UNO bindings
+    return importlib.import_module("extension.tools.document_tools")
+
 def make_tool(func_name):
-    func = getattr(doc_tools, func_name)
+    from langchain.tools import Tool
+    func = getattr(_document_tools(), func_name)
     wrapped_func = safe_tool_call(func)
     # Accepts a dict of arguments, unpacks for the function
     def tool_entry(args_dict):
@@ -58,9 +65,147 @@ def make_tool(func_name):
         description=func.__doc__ or f"Call {func_name} from document_tools"
     )
 
+# JSON Schema types for the annotations used in document_tools
+_JSON_TYPES = {str: "string", int: "integer", float: "number", bool: "boolean", list: "array", tuple: "array",
+               dict: "object"}
+
+# Types for parameters left unannotated, by name; any other unannotated parameter is a string
+_UNTYPED_PARAMS = {"position": "integer", "index": "integer", "width": "integer", "height": "integer",
+                   "level": "integer", "row": "integer", "column": "integer", "items": "array", "data": "array"}
+
+# Keywords that make a group of tools relevant to a request, matched as whole words (see _mentions)
+TOOL_GROUPS = {
+    "read": (("find", "search", "where", "read", "count", "word", "paragraph", "structure", "summary", "summarize",
+              "summarise", "text"),
+             ["find_text", "count_words", "count_paragraphs", "get_document_structure", "get_text",
+              "get_paragraph_text", "get_current_cursor_position"]),
+    "edit": (("insert", "add", "write", "append", "replace", "delete", "remove", "change", "rewrite", "fix",
+              "correct", "move", "cursor"),
+             ["insert_text_at_cursor", "insert_text_at_position", "replace_text", "delete_text_range",
+              "move_cursor_to_position"]),
+    "format": (("bold", "italic", "underline", "font", "size", "color", "colour", "style", "format", "emphasis",
+                "emphasize", "emphasise", "highlight"),
+               ["apply_character_style", "apply_paragraph_style", "set_bold", "set_italic", "set_underline",
+                "set_font_size", "set_font_color"]),
+    "structure": (("section", "heading", "title", "list", "bullet", "number", "header", "footer"),
+                  ["insert_section", "delete_section", "set_header", "set_footer", "insert_bullet_list",
+                   "insert_numbered_list", "insert_heading"]),
+    "table": (("table", "cell", "row", "column"), ["insert_table", "set_table_cell_text", "delete_table"]),
+    "image": (("image", "picture", "figure", "photo"), ["insert_image", "delete_image"]),
+    "history": (("undo", "redo", "revert", "save"), ["undo_last_action", "redo_last_action", "save_document"]),
+}
+
+# Always offered so the model can locate the text it is asked to change
+CORE_TOOLS = ["find_text", "get_paragraph_text"]
+
+def _describe(func_name, func):
+    # First sentence of the docstring; tools without one are described by their name
+    doc = inspect.getdoc(func)
+    if not doc:
+        return func_name.replace("_", " ").capitalize() + "."
+    first = doc.split("\n", 1)[0]
+    return first.split(". ", 1)[0].rstrip(".") + "."
+
+def _json_schema(annotation):
+    # Optional[X] is described as X; the default of None is implied by the parameter not being required
+    args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+    origin = typing.get_origin(annotation)
+    if origin is typing.Union and len(args) == 1:
+        return _json_schema(args[0])
+    schema = {}
+    if (origin or annotation) in _JSON_TYPES:
+        schema["type"] = _JSON_TYPES[origin or annotation]
+    if schema.get("type") == "array" and len(args) == 1:
+        schema["items"] = _json_schema(args[0])
+    return schema
+
+def make_schema(func_name):
+    """Compact JSON Schema description of a document tool, derived from its signature and docstring."""
+    func = getattr(_document_tools(), func_name)
+    properties = {}
+    required = []
+    for param in inspect.signature(func).parameters.values():
+        if param.annotation is inspect.Parameter.empty:
+            prop = {"type": _UNTYPED_PARAMS.get(param.name, "string")}
+        else:
+            prop = _json_schema(param.annotation)
+        properties[param.name] = prop
+        if param.default is inspect.Parameter.empty:
+            required.append(param.name)
+    parameters = {"type": "object", "properties": properties}
+    if required:
+        parameters["required"] = required
+    return {"name": func_name, "description": _describe(func_name, func), "parameters": parameters}
+
+class _LazyToolRegistry(Mapping):
+    """Read-only mapping of tool name to LangChain Tool; each tool is built on first access."""
+    def __init__(self, names):
+        self._names = list(names)
+        self._tools = {}
+        self._schemas = {}
+
+    def schema(self, name):
+        """Function-calling schema for a tool, built once."""
+        if name not in self._schemas:
+            if name not in self._names:
+                raise KeyError(name)
+            self._schemas[name] = make_schema(name)
+        return self._schemas[name]
+
+    def __getitem__(self, name):
+        if name not in self._tools:
+            if name not in self._names:
+                raise KeyError(name)
+            self._tools[name] = make_tool(name)
+        return self._tools[name]
+
+    def __contains__(self, name):
+        return name in self._names
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def __len__(self):
+        return len(self._names)
+
 # Registry of LangChain tools
-AGENTIC_TOOLS = [make_tool(name) for name in TOOL_FUNCTIONS]
-TOOL_REGISTRY = {tool.name: tool for tool in AGENTIC_TOOLS}
+TOOL_REGISTRY = _LazyToolRegistry(TOOL_FUNCTIONS)
+
+def __getattr__(name):
+    # AGENTIC_TOOLS materializes every tool, so it is only built when asked for
+    if name == "AGENTIC_TOOLS":
+        return list(TOOL_REGISTRY.values())
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def tool_schemas(names=None):
+    """Function-calling schemas for the named tools (default: every tool), for LLMProviderBase.generate_with_tools."""
+    return [TOOL_REGISTRY.schema(name) for name in (names or TOOL_FUNCTIONS)]
+
+# Endings that still count as the keyword: "tables", "bolded", "searches", "listing"
+_INFLECTIONS = ("s", "es", "d", "ed", "ing")
+
+def _mentions(word, keyword):
+    """True if word is keyword or an inflection of it ("cells", "moving"), not any longer word ("address")."""
+    if word == keyword:
+        return True
+    if word.startswith(keyword) and word[len(keyword):] in _INFLECTIONS:
+        return True
+    return keyword.endswith("e") and word == keyword[:-1] + "ing"
+
+def select_tools(request):
+    """
+    Names of the tools relevant to a request, in TOOL_FUNCTIONS order: the groups whose keywords
+    appear in it plus CORE_TOOLS. A request that matches no group gets every tool.
+    """
+    words = "".join(c.lower() if c.isalnum() else " " for c in request).split()
+    selected = set()
+    for keywords, names in TOOL_GROUPS.values():
+        if any(_mentions(word, keyword) for word in words for keyword in keywords):
+            selected.update(names)
+    if not selected:
+        return list(TOOL_FUNCTIONS)
+    selected.update(CORE_TOOLS)
+    return [name for name in TOOL_FUNCTIONS if name in selected]
 
 def call_tool(tool_name, **kwargs):
     """Call a registered tool by name with keyword arguments. Logs call and errors."""
@@ -76,3 +221,27 @@ def call_tool(tool_name, **kwargs):
     except Exception as e:
         logger.error(f"Tool '{tool_name}' failed: {e}", exc_info=True)
         raise
+
+def call_tools(calls, undo_title="LibreAI edits"):
+    """
+    Run a list of tool calls against the current document as one batch.
+    calls: list of dicts with keys 'tool' (str) and 'args' (dict).
+    The document is resolved once, repainted once, and all edits form a single undo step.
+    Returns one result dict per call, in order; a failing call does not stop the batch.
+    """
+    results = []
+    logger.info(f"Dispatching batch of {len(calls)} tool calls.")
+    try:
+        with _document_tools().batch_edit(undo_title):
+            for call in calls:
+                try:
+                    result = call_tool(call['tool'], **call.get('args', {}))
+                    results.append({"success": True, "result": result})
+                except Exception as e:
+                    results.append({"success": False, "error": str(e)})
+    except Exception as e:
+        # No document to edit (or it could not be locked): the calls not yet run fail with the reason,
+        # so the model sees it instead of the whole turn aborting
+        logger.error(f"Tool batch failed: {e}")
+        results.extend({"success": False, "error": str(e)} for _ in calls[len(results):])
+    return results
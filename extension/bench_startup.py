@@ -0,0 +1,40 @@
+"""
+Startup timing benchmark for LLM provider resolution.
+
+Run from the repository root:  python -m extension.bench_startup [provider] [runs]
+
+Each snippet runs in a fresh interpreter, so module import costs are measured cold.
+"eager" imports every provider module, as provider_factory used to at load time;
+"lazy" imports the factory and resolves only the requested provider.
+"""
+import subprocess
+import sys
+import time
+
+SNIPPETS = {
+    "baseline": "pass",
+    "eager": "; ".join(
+        f"import extension.llm_providers.{name}_provider" for name in ("openai", "anthropic", "google", "ollama")),
+    "lazy": "from extension.llm_providers.provider_factory import get_provider_class; get_provider_class({provider!r})",
+}
+
+def time_snippet(code, runs):
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    provider = sys.argv[1] if len(sys.argv) > 1 else "openai"
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    timings = {name: time_snippet(code.format(provider=provider), runs) for name, code in SNIPPETS.items()}
+    baseline = timings.pop("baseline")
+    for name, elapsed in timings.items():
+        print(f"{name:>5}: {(elapsed - baseline) * 1000:8.1f} ms (best of {runs}, interpreter startup subtracted)")
+    print(f"lazy resolution of '{provider}' saves {(timings['eager'] - timings['lazy']) * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main()
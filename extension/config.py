@@ -47,3 +47,26 @@ def save_config(config):
 def get_env_or_config(key, config):
     # Environment variable takes precedence
     return os.environ.get(key.upper()) or config.get(key, "")
+
+# Client-side request rate per provider. requests_per_minute=0 turns limiting off
+# (local Ollama models need none). A "rate_limits" section in config.json overrides these.
+DEFAULT_RATE_LIMITS = {
+    "openai": {"requests_per_minute": 60, "burst": 10},
+    "anthropic": {"requests_per_minute": 50, "burst": 10},
+    "google": {"requests_per_minute": 60, "burst": 10},
+    "ollama": {"requests_per_minute": 0, "burst": 0},
+}
+
+# Retries for rate-limited (429) and transient server errors; overridden by a "retry" section
+DEFAULT_RETRY_CONFIG = {"max_retries": 4, "base_delay": 1.0, "max_delay": 30.0, "jitter": 0.5}
+
+def get_rate_limit(config, provider=None):
+    provider = (provider or config.get('provider', 'openai')).lower()
+    settings = dict(DEFAULT_RATE_LIMITS.get(provider, {"requests_per_minute": 0, "burst": 0}))
+    settings.update((config.get('rate_limits') or {}).get(provider) or {})
+    return settings
+
+def get_retry_settings(config):
+    settings = dict(DEFAULT_RETRY_CONFIG)
+    settings.update(config.get('retry') or {})
+    return settings
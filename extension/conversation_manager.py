@@ -1,52 +1,274 @@
+import threading
+from collections import deque
+from itertools import islice
 
-# Try to import tiktoken, otherwise use a fallback estimator
-try:
-    import tiktoken
-    _TIKTOKEN_AVAILABLE = True
-except ImportError:
-    tiktoken = None
-    _TIKTOKEN_AVAILABLE = False
+from extension.token_counter import TokenCounter
 
 class ConversationManager:
-    def __init__(self, max_tokens=100000, summarizer=None):
+    def __init__(self, max_tokens=100000, summarizer=None, background_summarization=False, soft_limit=0.75,
+                 summary_fanout=4, summary_levels=3, model_name=None, estimate_tokens=False, exact_margin=0.1):
         self.max_tokens = max_tokens
         self.summarizer = summarizer  # Should be a callable that summarizes conversation
-        self.history = []  # List of dicts: {"role": "user"|"ai", "content": str}
-        if _TIKTOKEN_AVAILABLE:
-            self.tokenizer = tiktoken.get_encoding("cl100k_base")
-        else:
-            self.tokenizer = None
+        # Summaries are tiered: level 0 holds one summary per compacted chunk of turns, and once
+        # a level holds more than summary_fanout entries its oldest ones are summarized into a
+        # single entry of the next level. The top level folds its two oldest entries together.
+        self.summary_fanout = summary_fanout
+        self.summary_levels = summary_levels
+        # In background mode the summarizer never runs inside add_message: older turns are
+        # compacted on a worker thread once usage passes soft_limit * max_tokens
+        self.background_summarization = background_summarization
+        self.soft_limit = soft_limit
+        self._compaction = None  # The background compaction in progress, if any
+        self.pinned = []  # System messages that are never evicted
+        self.summary_tiers = []  # summary_tiers[level] is a list of system messages, oldest first
+        self.history = deque()  # Sliding window of dicts: {"role": "user"|"ai", "content": str}
+        self._token_counts = deque()  # Token count of each message in history, computed once on insertion
+        self._pinned_tokens = 0
+        self._summary_tokens = 0
+        self._token_total = 0  # Tokens in pinned, summaries and history together
+        # Change counters for incremental renderers: epoch changes whenever anything other
+        # than appending to / evicting from the window happens
+        self.epoch = 0
+        self.appended = 0
+        self.evicted = 0
+        self.token_counter = TokenCounter(model_name)
+        # With estimate_tokens, new turns are counted with the calibrated estimator and only
+        # recounted exactly once usage comes within exact_margin of a limit
+        self.estimate_tokens = estimate_tokens
+        self.exact_margin = exact_margin
+        self._estimated = 0  # The newest _estimated turns in history carry estimated counts
 
-    def add_message(self, role, content):
-        self.history.append({"role": role, "content": content})
+    def add_message(self, role, content, pinned=None):
+        """Append a message. System messages are pinned (kept through eviction) unless pinned=False."""
+        message = {"role": role, "content": content}
+        if pinned is None:
+            pinned = role == "system"
+        if self.estimate_tokens and not pinned:
+            tokens = self.token_counter.estimate(content)
+            self._estimated += 1
+        else:
+            tokens = self._count_tokens(content)
+        if pinned:
+            self.pinned.append(message)
+            self._pinned_tokens += tokens
+            self.epoch += 1
+        else:
+            self.history.append(message)
+            self._token_counts.append(tokens)
+            self.appended += 1
+        self._token_total += tokens
         self._enforce_token_limit()
 
     def get_history(self):
-        return self.history
+        """Return the conversation as a list: pinned messages, then the summaries, then recent turns."""
+        messages = list(self.pinned)
+        messages.extend(self.summary_messages())
+        messages.extend(self.history)
+        return messages
+
+    def summary_messages(self):
+        """Return every summary, oldest (highest level) first."""
+        return [m for level in reversed(self.summary_tiers) for m in level]
+
+    def latest_messages(self, count):
+        """Return the last count messages of the window, oldest first, in O(count)."""
+        return list(islice(reversed(self.history), count))[::-1]
 
     def _count_tokens(self, text):
-        if self.tokenizer:
-            return len(self.tokenizer.encode(text))
-        # Fallback: estimate 1 token ≈ 4 characters (OpenAI heuristic)
-        return max(1, len(text) // 4)
+        return self.token_counter.count(text)
 
     def _total_tokens(self):
-        return sum(self._count_tokens(m["content"]) for m in self.history)
+        return self._token_total
+
+    def _pop_oldest(self):
+        self.history.popleft()
+        self._token_total -= self._token_counts.popleft()
+        self._estimated = min(self._estimated, len(self.history))
+        self.evicted += 1
+
+    def _refine_near_limit(self):
+        """Replace estimated counts with exact ones when usage is close to the lowest active limit."""
+        if not self._estimated:
+            return
+        limit = self.max_tokens
+        if self.background_summarization and self.summarizer:
+            limit *= self.soft_limit
+        if self._token_total < limit * (1 - self.exact_margin):
+            return
+        # Estimated turns are always the newest, so only they are visited
+        for i in range(1, self._estimated + 1):
+            exact = self._count_tokens(self.history[-i]["content"])
+            self._token_total += exact - self._token_counts[-i]
+            self._token_counts[-i] = exact
+        self._estimated = 0
 
     def _enforce_token_limit(self):
+        self._refine_near_limit()
+        if self.background_summarization and self.summarizer:
+            self._apply_compaction()
+            if self._total_tokens() > self.max_tokens * self.soft_limit:
+                self._start_compaction()
+            if self._total_tokens() > self.max_tokens:
+                # Never wait for the summarizer here; drop the oldest turns instead
+                self._evict_to_limit()
+            return
         total = self._total_tokens()
         if total > self.max_tokens:
             self._summarize_conversation()
 
+    def _evict_to_limit(self):
+        while self._total_tokens() > self.max_tokens and len(self.history) > 1:
+            self._pop_oldest()
+
+    def _set_summary_tiers(self, tiers):
+        self.summary_tiers = tiers
+        # Summaries are few and bounded by fanout * levels, so recounting them is cheap
+        tokens = sum(self._count_tokens(m["content"]) for m in self.summary_messages())
+        self._token_total += tokens - self._summary_tokens
+        self._summary_tokens = tokens
+        self.epoch += 1
+
+    def _drop_summarized(self, count):
+        for _ in range(count):
+            self.history.popleft()
+            self._token_total -= self._token_counts.popleft()
+        self._estimated = min(self._estimated, len(self.history))
+
+    def _chunk_size(self):
+        """Number of oldest turns to compact so the window ends up well under the soft limit."""
+        target = self.max_tokens * self.soft_limit / 2
+        remaining = self._total_tokens()
+        count = 0
+        for tokens in self._token_counts:
+            if remaining <= target or count >= len(self.history) - 1:
+                break
+            remaining -= tokens
+            count += 1
+        return count
+
+    def _compact(self, chunk, tiers):
+        """Summarize chunk into a new level-0 summary, folding full levels upward. Returns new tiers."""
+        tiers = [list(level) for level in tiers]
+        self._push_summary(tiers, 0, self.summarizer(chunk))
+        return tiers
+
+    def _push_summary(self, tiers, level, content):
+        if len(tiers) == level:
+            tiers.append([])
+        tiers[level].append({"role": "system", "content": content})
+        if len(tiers[level]) <= self.summary_fanout:
+            return
+        if level + 1 < self.summary_levels:
+            merged = self.summarizer(tiers[level][:self.summary_fanout])
+            del tiers[level][:self.summary_fanout]
+            self._push_summary(tiers, level + 1, merged)
+        else:
+            merged = self.summarizer(tiers[level][:2])
+            tiers[level][:2] = [{"role": "system", "content": merged}]
+
     def _summarize_conversation(self):
-        if not self.summarizer:
+        count = self._chunk_size() if self.summarizer else 0
+        if count == 0:
             # Remove oldest messages until under limit
-            while self._total_tokens() > self.max_tokens and len(self.history) > 1:
-                self.history.pop(0)
+            self._evict_to_limit()
+            return
+        # Only the oldest chunk of turns is summarized; earlier summaries are left as they are
+        tiers = self._compact(list(islice(self.history, count)), self.summary_tiers)
+        self._drop_summarized(count)
+        self._set_summary_tiers(tiers)
+        self._evict_to_limit()
+
+    def _start_compaction(self):
+        """Summarize the oldest turns on a background thread, leaving the window well under the soft limit."""
+        if self._compaction is not None:
             return
-        # Use summarizer to compact conversation
-        summary = self.summarizer(self.history)
-        self.history = [{"role": "system", "content": summary}]
+        count = self._chunk_size()
+        if count == 0:
+            return
+        chunk = list(islice(self.history, count))
+        tiers = self.summary_tiers
+        job = {"count": count, "base": tiers, "evicted": self.evicted,
+               "tiers": None, "done": threading.Event()}
+
+        def run():
+            try:
+                job["tiers"] = self._compact(chunk, tiers)
+            except Exception:
+                job["tiers"] = None
+            finally:
+                job["done"].set()
+
+        job["thread"] = threading.Thread(target=run, name="libreai-summarizer", daemon=True)
+        self._compaction = job
+        job["thread"].start()
+
+    def _apply_compaction(self):
+        """Swap finished background summaries in for the turns they cover."""
+        job = self._compaction
+        if job is None or not job["done"].is_set():
+            return
+        self._compaction = None
+        # Discard the summaries if they were built on tiers that have since been replaced
+        if job["tiers"] is None or job["base"] is not self.summary_tiers:
+            return
+        # Turns evicted while the summarizer ran are the oldest of the chunk, and are covered
+        # by the summary all the same; only the rest of the chunk is still in the window
+        remaining = max(job["count"] - (self.evicted - job["evicted"]), 0)
+        self._drop_summarized(remaining)
+        self._set_summary_tiers(job["tiers"])
 
     def notify_user_of_summarization(self, notify_func):
         notify_func("Conversation was summarized to stay within token limit.")
+
+
+class ConversationRenderer:
+    """
+    Keeps a text rendering of a ConversationManager up to date incrementally.
+    sync() returns the (start, end, text) replacements to apply, in order, to the text
+    produced so far: appended turns are rendered once and evicted turns are cut out,
+    and the whole text is only rebuilt after summarization, a new pinned message,
+    or when following a different conversation.
+    """
+    def __init__(self, render_message):
+        self.render_message = render_message
+        self.length = 0  # Length of the rendered text after the last sync
+        self._conversation = None
+        self._epoch = self._appended = self._evicted = 0
+        self._prefix_length = 0  # Pinned messages and summaries
+        self._line_lengths = deque()  # One entry per message in the window
+
+    def sync(self, conversation):
+        if conversation is not self._conversation or conversation.epoch != self._epoch:
+            edits = [self._rebuild(conversation)]
+        else:
+            edits = []
+            evicted = conversation.evicted - self._evicted
+            dropped = min(evicted, len(self._line_lengths))
+            if dropped:
+                removed = sum(self._line_lengths.popleft() for _ in range(dropped))
+                edits.append((self._prefix_length, self._prefix_length + removed, ""))
+                self.length -= removed
+            # Messages evicted beyond the ones already rendered were never shown
+            new_count = conversation.appended - self._appended - (evicted - dropped)
+            if new_count > 0:
+                lines = [self.render_message(m) for m in conversation.latest_messages(new_count)]
+                text = "".join(lines)
+                edits.append((self.length, self.length, text))
+                self._line_lengths.extend(len(line) for line in lines)
+                self.length += len(text)
+        self._conversation = conversation
+        self._epoch = conversation.epoch
+        self._appended = conversation.appended
+        self._evicted = conversation.evicted
+        return edits
+
+    def _rebuild(self, conversation):
+        head = list(conversation.pinned) + conversation.summary_messages()
+        prefix = "".join(self.render_message(m) for m in head)
+        lines = [self.render_message(m) for m in conversation.history]
+        text = prefix + "".join(lines)
+        edit = (0, self.length, text)
+        self._prefix_length = len(prefix)
+        self._line_lengths = deque(len(line) for line in lines)
+        self.length = len(text)
+        return edit
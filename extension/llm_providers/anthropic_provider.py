@@ -1,14 +1,82 @@
 
 from .base import LLMProviderBase
+from .http_pool import get_http_client, http_settings
+from .tool_calling import anthropic_tools, parse_arguments
 from langchain.llms import Anthropic
 
 class AnthropicProvider(LLMProviderBase, Anthropic):
     def __init__(self, config):
         api_key = config.get("api_key")
         model_name = config.get("model_name", "claude-3-opus-20240229")
-        params = config.get("params", {})
+        params = dict(config.get("params", {}))
+        params.setdefault("default_request_timeout", http_settings(config)["timeout"])
+        # Retries are handled by LLMProviderBase, which also honours Retry-After
+        params.setdefault("max_retries", 0)
         Anthropic.__init__(self, anthropic_api_key=api_key, model=model_name, **params)
         LLMProviderBase.__init__(self, config)
+        self.tool_client = None  # SDK client for tool calls, on the shared connection pool
 
-    def generate(self, prompt, **kwargs):
+    def _tool_client(self):
+        # LangChain's Anthropic takes no http_client, so its own client is left alone and
+        # tool calls go through a separate SDK client built once per provider
+        if self.tool_client is None:
+            import anthropic
+            self.tool_client = anthropic.Anthropic(
+                base_url=self.anthropic_api_url,
+                api_key=self.anthropic_api_key.get_secret_value(),
+                http_client=get_http_client(self.config),
+                max_retries=0,
+            )
+        return self.tool_client
+
+    def _generate_text(self, prompt, **kwargs):
         return self(prompt, **kwargs)
+
+    async def _agenerate_text(self, prompt, **kwargs):
+        return await Anthropic.ainvoke(self, prompt, **kwargs)
+
+    def _stream_text(self, prompt, **kwargs):
+        for chunk in Anthropic.stream(self, prompt, **kwargs):
+            yield chunk
+
+    def supports_native_tools(self):
+        return True
+
+    def _generate_with_tools(self, prompt, tools, **kwargs):
+        params = self._sampling_params(kwargs)
+        params.setdefault("max_tokens", self.max_tokens_to_sample)
+        response = self._tool_client().messages.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            tools=anthropic_tools(tools),
+            **params,
+        )
+        content = "".join(block.text for block in response.content if block.type == "text")
+        calls = [{"tool": block.name, "args": dict(block.input)}
+                 for block in response.content if block.type == "tool_use"]
+        return {"content": content, "tool_calls": calls}
+
+    def _stream_with_tools(self, prompt, tools, **kwargs):
+        params = self._sampling_params(kwargs)
+        params.setdefault("max_tokens", self.max_tokens_to_sample)
+        stream = self._tool_client().messages.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            tools=anthropic_tools(tools),
+            stream=True,
+            **params,
+        )
+        calls = {}  # Tool input arrives as JSON fragments, keyed by content block index
+        try:
+            for event in stream:
+                if event.type == "content_block_start" and event.content_block.type == "tool_use":
+                    calls[event.index] = {"name": event.content_block.name, "input": ""}
+                elif event.type == "content_block_delta":
+                    if event.delta.type == "text_delta":
+                        yield event.delta.text
+                    elif event.delta.type == "input_json_delta":
+                        calls[event.index]["input"] += event.delta.partial_json
+        finally:
+            stream.close()
+        for index in sorted(calls):
+            yield {"tool": calls[index]["name"], "args": parse_arguments(calls[index]["input"])}
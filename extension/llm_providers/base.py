@@ -1,8 +1,116 @@
 """
 Base class for LLM providers using LangChain.
 """
+import asyncio
+from functools import partial
+
+from .resilience import call_with_retry, call_with_retry_async, stream_with_retry
+from .response_cache import ResponseCache, get_response_cache
+from .tool_calling import parse_tool_calls, tool_instructions
+
+DEFAULT_MAX_CONCURRENCY = 4
+
 class LLMProviderBase:
+    # Provider state kept beside the fields of the LangChain model, whose pydantic __setattr__ rejects it
+    _provider_attributes = ("config", "tool_client")
+
     def __init__(self, config):
         self.config = config
-    def generate(self, prompt, **kwargs):
+    def __setattr__(self, name, value):
+        if name in self._provider_attributes:
+            object.__setattr__(self, name, value)
+        else:
+            super().__setattr__(name, value)
+    def generate(self, prompt, use_cache=True, **kwargs):
+        """Return the completion for prompt, from the response cache when possible. use_cache=False always calls the model."""
+        cache = get_response_cache(self.config) if use_cache else None
+        if cache is not None:
+            key = self._response_cache_key(prompt, kwargs)
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
+        response = call_with_retry(self._generate_text, self.config, prompt, **kwargs)
+        if cache is not None:
+            cache.put(key, response)
+        return response
+    def generate_stream(self, prompt, use_cache=True, **kwargs):
+        """Yield the completion in chunks as they arrive. A cached completion is yielded as one chunk."""
+        cache = get_response_cache(self.config) if use_cache else None
+        if cache is not None:
+            key = self._response_cache_key(prompt, kwargs)
+            cached = cache.get(key)
+            if cached is not None:
+                yield cached
+                return
+        chunks = []
+        for chunk in stream_with_retry(self._stream_text, self.config, prompt, **kwargs):
+            chunks.append(chunk)
+            yield chunk
+        # Only completions streamed to the end are cached
+        if cache is not None:
+            cache.put(key, "".join(chunks))
+    async def generate_async(self, prompt, use_cache=True, **kwargs):
+        """Asynchronous generate(); shares the response cache with it."""
+        cache = get_response_cache(self.config) if use_cache else None
+        if cache is not None:
+            key = self._response_cache_key(prompt, kwargs)
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
+        response = await call_with_retry_async(self._agenerate_text, self.config, prompt, **kwargs)
+        if cache is not None:
+            cache.put(key, response)
+        return response
+    async def generate_many_async(self, prompts, max_concurrency=None, **kwargs):
+        """Generate completions for independent prompts concurrently, at most max_concurrency at a time, in order."""
+        limit = max_concurrency or self.config.get("max_concurrency", DEFAULT_MAX_CONCURRENCY)
+        semaphore = asyncio.Semaphore(limit)
+        async def run(prompt):
+            async with semaphore:
+                return await self.generate_async(prompt, **kwargs)
+        return await asyncio.gather(*(run(prompt) for prompt in prompts))
+    def generate_batch(self, prompts, max_concurrency=None, **kwargs):
+        """Synchronous entry point for generate_many_async; returns the completions in prompt order."""
+        return asyncio.run(self.generate_many_async(prompts, max_concurrency=max_concurrency, **kwargs))
+    def generate_with_tools(self, prompt, tools, **kwargs):
+        """
+        Return the reply to prompt as {"content": str, "tool_calls": [{"tool", "args"}, ...]}; the model may
+        call several of the tools (schemas from agentic_tools.tool_schemas) at once. Not cached.
+        """
+        return call_with_retry(self._generate_with_tools, self.config, prompt, tools, **kwargs)
+    def stream_with_tools(self, prompt, tools, **kwargs):
+        """
+        Yield the reply to prompt as it arrives: text chunks as str, then each tool call as a
+        {"tool", "args"} dict. A failure is only retried before the first item. Not cached.
+        """
+        return stream_with_retry(self._stream_with_tools, self.config, prompt, tools, **kwargs)
+    def supports_native_tools(self):
+        """True if the provider's API returns structured tool calls."""
+        return False
+    def _generate_with_tools(self, prompt, tools, **kwargs):
+        # Without native tool calling the tools are described in the prompt and the reply is parsed
+        return parse_tool_calls(self._generate_text(tool_instructions(tools) + prompt, **kwargs))
+    def _stream_with_tools(self, prompt, tools, **kwargs):
+        # Providers without a streaming tool-calling API deliver the reply whole
+        reply = self._generate_with_tools(prompt, tools, **kwargs)
+        if reply["content"]:
+            yield reply["content"]
+        yield from reply["tool_calls"]
+    def _sampling_params(self, kwargs):
+        # Generation parameters from config that the raw tool-calling APIs understand
+        params = {k: v for k, v in self.config.get("params", {}).items() if k in ("temperature", "top_p", "max_tokens")}
+        params.update(kwargs)
+        return params
+    def _generate_text(self, prompt, **kwargs):
         raise NotImplementedError
+    async def _agenerate_text(self, prompt, **kwargs):
+        # Providers without a native async client run the blocking call on the default executor
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, partial(self._generate_text, prompt, **kwargs))
+    def _stream_text(self, prompt, **kwargs):
+        # Providers without streaming deliver the completion as one chunk
+        yield self._generate_text(prompt, **kwargs)
+    def _response_cache_key(self, prompt, kwargs):
+        params = dict(self.config.get("params", {}))
+        params.update(kwargs)
+        return ResponseCache.make_key(type(self).__name__, self.config.get("model_name"), params, prompt)
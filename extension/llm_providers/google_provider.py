@@ -6,9 +6,11 @@ class GoogleProvider(LLMProviderBase, GooglePalm):
     def __init__(self, config):
         api_key = config.get("api_key")
         model_name = config.get("model_name", "models/text-bison-001")
-        params = config.get("params", {})
+        params = dict(config.get("params", {}))
+        # Retries are handled by LLMProviderBase
+        params.setdefault("max_retries", 0)
         GooglePalm.__init__(self, google_api_key=api_key, model=model_name, **params)
         LLMProviderBase.__init__(self, config)
 
-    def generate(self, prompt, **kwargs):
+    def _generate_text(self, prompt, **kwargs):
         return self(prompt, **kwargs)
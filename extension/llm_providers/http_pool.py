@@ -0,0 +1,83 @@
+"""
+Persistent, pooled HTTP clients shared by the LLM providers.
+
+Keeping connections alive between turns saves a TCP and TLS handshake per request.
+Pool size and timeouts come from the "http" section of config.json. The clients
+are closed and rebuilt when the provider is reloaded.
+
+Only clients that accept a client or session are pooled: the OpenAI completions and
+every native tool call. LangChain's Anthropic and Ollama completions keep their own
+connections.
+"""
+import asyncio
+import threading
+
+DEFAULT_HTTP_CONFIG = {"pool_size": 10, "timeout": 60.0, "connect_timeout": 10.0}
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def http_settings(config):
+    settings = dict(DEFAULT_HTTP_CONFIG)
+    settings.update(config.get("http") or {})
+    return settings
+
+
+def get_http_client(config):
+    """Return the shared httpx.Client used by the OpenAI and Anthropic SDKs."""
+    with _clients_lock:
+        if "httpx" not in _clients:
+            import httpx
+            settings = http_settings(config)
+            _clients["httpx"] = httpx.Client(
+                limits=httpx.Limits(max_connections=settings["pool_size"],
+                                    max_keepalive_connections=settings["pool_size"]),
+                timeout=httpx.Timeout(settings["timeout"], connect=settings["connect_timeout"]),
+            )
+        return _clients["httpx"]
+
+
+def get_async_http_client(config):
+    """Return the shared httpx.AsyncClient used by the asynchronous OpenAI SDK client."""
+    with _clients_lock:
+        if "httpx_async" not in _clients:
+            import httpx
+            settings = http_settings(config)
+            _clients["httpx_async"] = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=settings["pool_size"],
+                                    max_keepalive_connections=settings["pool_size"]),
+                timeout=httpx.Timeout(settings["timeout"], connect=settings["connect_timeout"]),
+            )
+        return _clients["httpx_async"]
+
+
+def get_requests_session(config):
+    """Return the shared requests.Session used for Ollama tool calls."""
+    with _clients_lock:
+        if "requests" not in _clients:
+            import requests
+            from requests.adapters import HTTPAdapter
+            settings = http_settings(config)
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=settings["pool_size"], pool_maxsize=settings["pool_size"])
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _clients["requests"] = session
+        return _clients["requests"]
+
+
+def close_http_clients():
+    """Close every pooled client; the next provider call opens fresh connections."""
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        try:
+            if hasattr(client, "aclose"):
+                # httpx.AsyncClient only closes from a coroutine; reloads happen outside any event loop
+                asyncio.run(client.aclose())
+            else:
+                client.close()
+        except Exception:
+            pass
@@ -1,14 +1,73 @@
+import json
 
 from .base import LLMProviderBase
+from .http_pool import get_requests_session, http_settings
+from .tool_calling import openai_tools, parse_arguments
 from langchain.llms import Ollama
 
 class OllamaProvider(LLMProviderBase, Ollama):
     def __init__(self, config):
         base_url = config.get("endpoint")
         model_name = config.get("model_name", "llama2")
-        params = config.get("params", {})
+        params = dict(config.get("params", {}))
+        params.setdefault("timeout", http_settings(config)["timeout"])
         Ollama.__init__(self, base_url=base_url, model=model_name, **params)
+        # LangChain's Ollama client has no hook for a session, so completions use its own
+        # connections; only the tool-calling requests below go through the shared pool
         LLMProviderBase.__init__(self, config)
 
-    def generate(self, prompt, **kwargs):
+    def _generate_text(self, prompt, **kwargs):
         return self(prompt, **kwargs)
+
+    async def _agenerate_text(self, prompt, **kwargs):
+        return await Ollama.ainvoke(self, prompt, **kwargs)
+
+    def _stream_text(self, prompt, **kwargs):
+        for chunk in Ollama.stream(self, prompt, **kwargs):
+            yield chunk
+
+    def supports_native_tools(self):
+        return True
+
+    def _chat_payload(self, prompt, tools, stream, kwargs):
+        # Ollama's chat endpoint takes OpenAI-style tool definitions
+        options = self._sampling_params(kwargs)
+        if "max_tokens" in options:
+            options["num_predict"] = options.pop("max_tokens")
+        return {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "tools": openai_tools(tools),
+            "options": options,
+            "stream": stream,
+        }
+
+    def _tool_calls(self, message):
+        return [{"tool": call["function"]["name"], "args": parse_arguments(call["function"].get("arguments"))}
+                for call in message.get("tool_calls") or []]
+
+    def _generate_with_tools(self, prompt, tools, **kwargs):
+        response = get_requests_session(self.config).post(
+            f"{self.base_url}/api/chat", json=self._chat_payload(prompt, tools, False, kwargs), timeout=self.timeout)
+        response.raise_for_status()
+        message = response.json().get("message", {})
+        return {"content": message.get("content", ""), "tool_calls": self._tool_calls(message)}
+
+    def _stream_with_tools(self, prompt, tools, **kwargs):
+        # The streamed reply is one JSON object per line; tool calls come whole, in any of them
+        response = get_requests_session(self.config).post(
+            f"{self.base_url}/api/chat", json=self._chat_payload(prompt, tools, True, kwargs),
+            timeout=self.timeout, stream=True)
+        calls = []
+        try:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                message = json.loads(line).get("message", {})
+                if message.get("content"):
+                    yield message["content"]
+                calls.extend(self._tool_calls(message))
+        finally:
+            response.close()
+        yield from calls
@@ -1,14 +1,83 @@
 
 from .base import LLMProviderBase
+from .http_pool import get_async_http_client, get_http_client, http_settings
+from .tool_calling import openai_tools, parse_arguments
 from langchain.llms import OpenAI
 
 class OpenAIProvider(LLMProviderBase, OpenAI):
+    def __new__(cls, config):
+        # BaseOpenAI.__new__ takes keyword arguments only, and swaps in OpenAIChat for chat model names
+        return object.__new__(cls)
+
     def __init__(self, config):
         api_key = config.get("api_key")
         model_name = config.get("model_name", "gpt-3.5-turbo")
-        params = config.get("params", {})
-        OpenAI.__init__(self, openai_api_key=api_key, model_name=model_name, **params)
+        params = dict(config.get("params", {}))
+        params.setdefault("request_timeout", http_settings(config)["timeout"])
+        # Retries are handled by LLMProviderBase, which also honours Retry-After
+        params.setdefault("max_retries", 0)
+        if config.get("endpoint"):
+            params.setdefault("openai_api_base", config["endpoint"])
+        # LangChain would hand one http_client to both OpenAI and AsyncOpenAI, and the async client
+        # only takes an httpx.AsyncClient, so both SDK clients are built here on the shared pools
+        import openai
+        client_params = {"api_key": api_key, "base_url": params.get("openai_api_base"),
+                         "timeout": params["request_timeout"], "max_retries": params["max_retries"]}
+        sync_client = openai.OpenAI(http_client=get_http_client(config), **client_params)
+        async_client = openai.AsyncOpenAI(http_client=get_async_http_client(config), **client_params)
+        OpenAI.__init__(self, openai_api_key=api_key, model_name=model_name,
+                        client=sync_client.completions, async_client=async_client.completions, **params)
         LLMProviderBase.__init__(self, config)
+        self.tool_client = sync_client  # Tool calls use chat completions on the same client
 
-    def generate(self, prompt, **kwargs):
+    def _generate_text(self, prompt, **kwargs):
         return self(prompt, **kwargs)
+
+    async def _agenerate_text(self, prompt, **kwargs):
+        return await OpenAI.ainvoke(self, prompt, **kwargs)
+
+    def _stream_text(self, prompt, **kwargs):
+        for chunk in OpenAI.stream(self, prompt, **kwargs):
+            yield chunk
+
+    def supports_native_tools(self):
+        return True
+
+    def _generate_with_tools(self, prompt, tools, **kwargs):
+        response = self.tool_client.chat.completions.create(
+            model=self.model_name,
+            messages=[{"role": "user", "content": prompt}],
+            tools=openai_tools(tools),
+            **self._sampling_params(kwargs),
+        )
+        message = response.choices[0].message
+        calls = [{"tool": call.function.name, "args": parse_arguments(call.function.arguments)}
+                 for call in message.tool_calls or []]
+        return {"content": message.content or "", "tool_calls": calls}
+
+    def _stream_with_tools(self, prompt, tools, **kwargs):
+        stream = self.tool_client.chat.completions.create(
+            model=self.model_name,
+            messages=[{"role": "user", "content": prompt}],
+            tools=openai_tools(tools),
+            stream=True,
+            **self._sampling_params(kwargs),
+        )
+        calls = {}  # Tool calls arrive in fragments, keyed by their index
+        try:
+            for event in stream:
+                if not event.choices:
+                    continue
+                delta = event.choices[0].delta
+                if delta.content:
+                    yield delta.content
+                for call in delta.tool_calls or []:
+                    entry = calls.setdefault(call.index, {"name": "", "arguments": ""})
+                    if call.function and call.function.name:
+                        entry["name"] += call.function.name
+                    if call.function and call.function.arguments:
+                        entry["arguments"] += call.function.arguments
+        finally:
+            stream.close()
+        for index in sorted(calls):
+            yield {"tool": calls[index]["name"], "args": parse_arguments(calls[index]["arguments"])}
@@ -1,20 +1,33 @@
 """
 Factory for instantiating LLM providers based on config.
+
+Provider modules import their LangChain client classes at module load, so they are
+only imported the first time a provider is actually requested.
 """
-from .openai_provider import OpenAIProvider
-from .anthropic_provider import AnthropicProvider
-from .google_provider import GoogleProvider
-from .ollama_provider import OllamaProvider
+import importlib
+
+# Provider name -> (module within this package, class name)
+PROVIDER_REGISTRY = {
+    'openai': ('.openai_provider', 'OpenAIProvider'),
+    'anthropic': ('.anthropic_provider', 'AnthropicProvider'),
+    'google': ('.google_provider', 'GoogleProvider'),
+    'ollama': ('.ollama_provider', 'OllamaProvider'),
+}
+
+_provider_classes = {}
+
+def get_provider_class(provider_name):
+    provider_name = provider_name.lower()
+    if provider_name not in _provider_classes:
+        if provider_name not in PROVIDER_REGISTRY:
+            raise ValueError(f"Unknown provider: {provider_name}")
+        module_name, class_name = PROVIDER_REGISTRY[provider_name]
+        module = importlib.import_module(module_name, __package__)
+        _provider_classes[provider_name] = getattr(module, class_name)
+    return _provider_classes[provider_name]
+
+def get_provider(provider_name, config):
+    return get_provider_class(provider_name)(config)
 
 def get_provider_from_config(config):
-    provider_name = config.get('provider', 'openai').lower()
-    if provider_name == 'openai':
-        return OpenAIProvider(config)
-    elif provider_name == 'anthropic':
-        return AnthropicProvider(config)
-    elif provider_name == 'google':
-        return GoogleProvider(config)
-    elif provider_name == 'ollama':
-        return OllamaProvider(config)
-    else:
-        raise ValueError(f"Unknown provider: {provider_name}")
+    return get_provider(config.get('provider', 'openai'), config)
@@ -0,0 +1,195 @@
+"""
+Retries and client-side rate limiting for provider calls.
+
+Each provider has a token bucket, so a burst of agent calls waits in line instead
+of running into 429s. Calls that still fail with a rate-limit or transient server
+error are retried with exponential backoff and jitter. When the server sends a
+Retry-After header, that wait is used instead, or the call fails at once if the
+server asks for longer than max_delay.
+"""
+import asyncio
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+from extension.config import get_rate_limit, get_retry_settings
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+
+
+class TokenBucket:
+    """
+    Allows requests_per_minute on average with bursts of up to burst requests.
+    reserve() takes a token at once and returns how long the caller must wait before using it,
+    so callers are served in arrival order whether they sleep in a thread or an event loop.
+    """
+    def __init__(self, requests_per_minute, burst=1):
+        self.rate = requests_per_minute / 60.0
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            # The deficit is paid back at the refill rate
+            return -self._tokens / self.rate
+
+    def acquire(self):
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self):
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def get_rate_limiter(config, provider=None):
+    """Return the shared TokenBucket for the configured provider, or None if it is not rate limited."""
+    provider = (provider or config.get("provider", "openai")).lower()
+    settings = get_rate_limit(config, provider)
+    if not settings.get("requests_per_minute"):
+        return None
+    key = (provider, settings["requests_per_minute"], settings.get("burst", 1))
+    with _buckets_lock:
+        if key not in _buckets:
+            _buckets[key] = TokenBucket(settings["requests_per_minute"], settings.get("burst", 1))
+        return _buckets[key]
+
+
+def _status_code(exc):
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status
+
+
+def is_retryable(exc):
+    """Rate limits, transient server errors and dropped connections are worth retrying."""
+    status = _status_code(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES
+    if isinstance(exc, (ConnectionError, TimeoutError)):
+        return True
+    # SDK connection errors (openai.APIConnectionError, httpx.ConnectTimeout, ...) carry no status
+    name = type(exc).__name__
+    return "Timeout" in name or "Connection" in name
+
+
+def retry_after(exc):
+    """Seconds to wait according to the error's Retry-After header, or None if there is none."""
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value is not None:
+        try:
+            return max(0.0, float(value) / 1000.0)
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt, settings, exc=None):
+    """
+    Delay before retry number attempt (0-based): Retry-After if given, else capped exponential
+    backoff with jitter. None means the server asked for a longer wait than max_delay, and the
+    call should not be retried.
+    """
+    delay = retry_after(exc) if exc is not None else None
+    if delay is not None:
+        # Retrying sooner than the server asked would only be refused again
+        return delay if delay <= settings["max_delay"] else None
+    delay = min(settings["max_delay"], settings["base_delay"] * (2 ** attempt))
+    delay += random.uniform(0, settings["jitter"] * delay)
+    return min(delay, settings["max_delay"])
+
+
+def call_with_retry(func, config, *args, **kwargs):
+    """Call func(*args, **kwargs) under the provider's rate limit, retrying retryable failures."""
+    settings = get_retry_settings(config)
+    limiter = get_rate_limiter(config)
+    attempt = 0
+    while True:
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            return func(*args, **kwargs)
+        except Exception as exc:
+            if attempt >= settings["max_retries"] or not is_retryable(exc):
+                raise
+            delay = backoff_delay(attempt, settings, exc)
+            if delay is None:
+                raise
+            time.sleep(delay)
+            attempt += 1
+
+
+async def call_with_retry_async(func, config, *args, **kwargs):
+    """Asynchronous call_with_retry for a coroutine function."""
+    settings = get_retry_settings(config)
+    limiter = get_rate_limiter(config)
+    attempt = 0
+    while True:
+        if limiter is not None:
+            await limiter.acquire_async()
+        try:
+            return await func(*args, **kwargs)
+        except Exception as exc:
+            if attempt >= settings["max_retries"] or not is_retryable(exc):
+                raise
+            delay = backoff_delay(attempt, settings, exc)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+            attempt += 1
+
+
+def stream_with_retry(func, config, *args, **kwargs):
+    """
+    Yield from the generator func(*args, **kwargs) under the rate limit. A failure is only
+    retried before the first chunk arrives; after that the partial output is already out.
+    """
+    settings = get_retry_settings(config)
+    limiter = get_rate_limiter(config)
+    attempt = 0
+    while True:
+        if limiter is not None:
+            limiter.acquire()
+        started = False
+        try:
+            for chunk in func(*args, **kwargs):
+                started = True
+                yield chunk
+            return
+        except Exception as exc:
+            if started or attempt >= settings["max_retries"] or not is_retryable(exc):
+                raise
+            delay = backoff_delay(attempt, settings, exc)
+            if delay is None:
+                raise
+            time.sleep(delay)
+            attempt += 1
@@ -0,0 +1,159 @@
+"""
+Response cache for LLM providers.
+
+Completions are keyed by provider, model, generation parameters and a hash of the
+prompt. Entries live in an in-memory LRU and, optionally, as JSON files under
+~/.libreai/cache so they survive restarts. The files are bounded too: once there
+are more than max_disk_entries, the least recently used ones are deleted.
+
+Caching is opt-in ("cache": {"enabled": true}): with sampling, asking the same
+prompt again is often meant to produce a different completion.
+"""
+import glob
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+DEFAULT_CACHE_CONFIG = {"enabled": False, "max_entries": 256, "persist": False, "max_disk_entries": 2048}
+
+
+class ResponseCache:
+    def __init__(self, max_entries=256, cache_dir=None, max_disk_entries=2048):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir  # None keeps the cache in memory only
+        self.max_disk_entries = max_disk_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_count = None  # Files in cache_dir, counted on the first write
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(provider, model, params, prompt):
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        material = json.dumps([provider, model, params, prompt_hash], sort_keys=True, default=str)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+        response = self._read(key)
+        with self._lock:
+            if response is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._remember(key, response)
+        return response
+
+    def put(self, key, response):
+        with self._lock:
+            self._remember(key, response)
+        self._write(key, response)
+
+    def clear(self):
+        """Forget every entry, in memory and on disk."""
+        with self._lock:
+            self._entries.clear()
+            for path in self._files():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._disk_count = 0
+
+    def _remember(self, key, response):
+        self._entries[key] = response
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + ".json")
+
+    def _files(self):
+        if not self.cache_dir:
+            return []
+        return glob.glob(os.path.join(self.cache_dir, "??", "*.json"))
+
+    def _read(self, key):
+        if not self.cache_dir:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                response = json.load(f)["response"]
+            # The modification time orders the files for pruning, so a hit counts as a use
+            os.utime(path)
+            return response
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _write(self, key, response):
+        if not self.cache_dir:
+            return
+        path = self._path(key)
+        try:
+            is_new = not os.path.exists(path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"response": response}, f)
+            os.replace(tmp_path, path)
+        except OSError:
+            # The on-disk store is best effort; the in-memory entry is already in place
+            return
+        with self._lock:
+            if self._disk_count is None:
+                self._disk_count = len(self._files())
+            elif is_new:
+                self._disk_count += 1
+            if self._disk_count > self.max_disk_entries:
+                self._prune()
+
+    def _prune(self):
+        # Listing the directory is only needed once the limit is passed; a tenth is deleted at a time
+        # so it is not listed again on the very next write
+        files = []
+        for path in self._files():
+            try:
+                files.append((os.path.getmtime(path), path))
+            except OSError:
+                pass
+        files.sort()
+        keep = self.max_disk_entries - self.max_disk_entries // 10
+        for _, path in files[:max(len(files) - keep, 0)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self._disk_count = min(len(files), keep)
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_response_cache(config):
+    """
+    Return the shared cache for the "cache" section of config, or None if caching is disabled.
+    Caches are shared across provider instances so reloading a provider keeps its entries.
+    """
+    settings = dict(DEFAULT_CACHE_CONFIG)
+    settings.update(config.get("cache") or {})
+    if not settings["enabled"]:
+        return None
+    cache_dir = None
+    if settings["persist"]:
+        cache_dir = settings.get("dir") or os.path.join(os.path.expanduser("~"), ".libreai", "cache")
+    key = (settings["max_entries"], cache_dir, settings["max_disk_entries"])
+    with _caches_lock:
+        if key not in _caches:
+            _caches[key] = ResponseCache(max_entries=settings["max_entries"], cache_dir=cache_dir,
+                                         max_disk_entries=settings["max_disk_entries"])
+        return _caches[key]
@@ -0,0 +1,87 @@
+"""
+Tool (function) calling support shared by the LLM providers.
+
+Tool schemas are {"name", "description", "parameters"} dicts, with parameters as
+JSON Schema (see agentic_tools.tool_schemas). Providers with a native tool-calling
+API convert them to the API's format. The others describe the tools in the prompt
+and the reply is parsed with parse_tool_calls.
+
+A reply is a dict: {"content": str, "tool_calls": [{"tool": str, "args": dict}, ...]}.
+"""
+import json
+
+
+def openai_tools(schemas):
+    return [{"type": "function", "function": schema} for schema in schemas]
+
+
+def anthropic_tools(schemas):
+    return [{"name": s["name"], "description": s["description"], "input_schema": s["parameters"]}
+            for s in schemas]
+
+
+_instructions = {}
+
+
+def tool_instructions(schemas):
+    """Prompt text describing the tools to a model without native tool calling, rendered once per tool set."""
+    key = tuple(schema["name"] for schema in schemas)
+    if key not in _instructions:
+        _instructions[key] = (
+            "You can edit the document with these tools (JSON Schema parameters; positions are "
+            "character offsets from the start of the document):\n"
+            + "\n".join(json.dumps(schema, separators=(",", ":")) for schema in schemas)
+            + "\nTo use tools, reply with only a JSON list of calls, e.g. "
+            '[{"tool": "set_bold", "args": {"start": 0, "end": 5}}]. '
+            "Several calls may be listed; they are applied in order.\n\n"
+        )
+    return _instructions[key]
+
+
+def _strip_code_fence(text):
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+        if text.rstrip().endswith("```"):
+            text = text.rstrip()[:-3]
+    return text.strip()
+
+
+def _as_tool_call(item):
+    if not isinstance(item, dict) or not isinstance(item.get("tool"), str):
+        return None
+    args = item.get("args") or {}
+    if not isinstance(args, dict):
+        return None
+    return {"tool": item["tool"], "args": args}
+
+
+def parse_tool_calls(text):
+    """
+    Parse a plain-text reply into a reply dict. A reply consisting of one tool call object,
+    a list of them, or {"tool_calls": [...]}, optionally in a code fence, is a set of tool calls;
+    anything else is returned as content.
+    """
+    body = _strip_code_fence(text.strip())
+    if body[:1] not in ("{", "["):
+        return {"content": text, "tool_calls": []}
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return {"content": text, "tool_calls": []}
+    if isinstance(data, dict):
+        data = data.get("tool_calls", [data])
+    if not isinstance(data, list):
+        return {"content": text, "tool_calls": []}
+    calls = [_as_tool_call(item) for item in data]
+    if not calls or None in calls:
+        return {"content": text, "tool_calls": []}
+    return {"content": "", "tool_calls": calls}
+
+
+def parse_arguments(arguments):
+    """Tool arguments arrive as a JSON string from some APIs and as a dict from others."""
+    if isinstance(arguments, dict):
+        return arguments
+    if not arguments:
+        return {}
+    return json.loads(arguments)
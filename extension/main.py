@@ -1,47 +1,148 @@
 
 # Main entry: orchestrator, agent, and LLM provider integration
 
+import json
+
 from extension.agent import ToolCallingAgent
+from extension.agentic_tools import select_tools, tool_schemas
 from extension.llm_providers.provider_factory import get_provider_from_config
+from extension.llm_providers.http_pool import close_http_clients
+from extension.llm_providers.tool_calling import parse_tool_calls, tool_instructions
 from extension.config import load_config
-from extension.conversation_manager import ConversationManager
+from extension.conversation_manager import ConversationManager, ConversationRenderer
+from extension.orchestrator import AgentLoop, agent_loop_settings
+from extension.tools.document_retrieval import format_chunks, retrieval_settings
+
+# Recorded as the reply to a request that was cancelled
+CANCELLED_REPLY = "(Request cancelled by the user.)"
+
+class RequestCancelled(Exception):
+    """Raised when a request is cancelled while it is being processed."""
+
 
 class LibreAIMain:
     def __init__(self, max_tokens=100000):
         self.config = load_config()
         self.provider = get_provider_from_config(self.config)
         self.agent = ToolCallingAgent()
-        self.conversation = ConversationManager(max_tokens=max_tokens, summarizer=self._summarize)
+        self.max_tokens = max_tokens
+        self.conversation = self._new_conversation()
+        # Rendered conversation, kept in step with self.conversation one turn at a time
+        self._prompt_renderer = ConversationRenderer(self._render_turn)
+        self._prompt_history = ""
+
+    def _new_conversation(self):
+        # Summaries are produced in the background so no turn waits on a summarization call
+        return ConversationManager(
+            max_tokens=self.max_tokens, summarizer=self._summarize, background_summarization=True,
+            model_name=self.config.get("model_name"),
+            estimate_tokens=self.config.get("token_counting") == "estimate")
+
+    def reset_conversation(self):
+        self.conversation = self._new_conversation()
 
     def reload_provider(self):
+        # Drop pooled connections so the new provider connects with the new settings
+        close_http_clients()
         self.config = load_config()
         self.provider = get_provider_from_config(self.config)
 
-    def process_user_request(self, user_message):
+    def process_user_request(self, user_message, on_token=None, cancel_event=None):
+        """
+        Run one conversation turn. The model may call tools over several steps, seeing each step's results,
+        within the "agent_loop" budgets in config; the calls of one step are applied as one batch.
+        If on_token is given, it is called with each chunk of the response as it streams in.
+        If cancel_event (a threading.Event) gets set, the request stops at the next chunk and raises RequestCancelled.
+        """
         self.conversation.add_message("user", user_message)
-        prompt = self._build_prompt()
-        ai_response = self.provider.generate(prompt)
+        # Only the tools relevant to the request are described to the model
+        tools = tool_schemas(select_tools(user_message))
+        loop = AgentLoop(
+            step=lambda prompt: self._next_step(prompt, tools, on_token, cancel_event),
+            dispatch=self.agent.perform_tasks,
+            token_counter=self.conversation.token_counter,
+            **agent_loop_settings(self.config))
+        try:
+            excerpts = self._document_excerpts(user_message)
+            # Only the excerpts are new to this turn; the conversation is already counted, so it is
+            # neither tokenized again nor charged to the loop's token budget on every step
+            outcome = loop.run(excerpts + self._build_prompt(), cancel_event,
+                               prompt_tokens=self.conversation.token_counter.count(excerpts))
+            if outcome["status"] == "cancelled":
+                raise RequestCancelled()
+        except RequestCancelled:
+            # Edits made before the cancel stay in the document, so the turn is kept and closed
+            # with a note rather than leaving a request the model would answer next time
+            self.conversation.add_message("ai", CANCELLED_REPLY)
+            raise
+        tool_calls = outcome["tool_calls"]
+        ai_response = outcome["content"] or json.dumps(tool_calls)
         self.conversation.add_message("ai", ai_response)
-        tool_result = None
-        if self._is_tool_call(ai_response):
-            task_spec = self._parse_tool_call(ai_response)
-            tool_result = self.agent.perform_task(task_spec)
-        return {"ai_response": ai_response, "tool_result": tool_result, "conversation": self.conversation.get_history()}
+        return {"ai_response": ai_response, "tool_calls": tool_calls, "tool_result": outcome["tool_results"] or None,
+                "status": outcome["status"], "steps": outcome["steps"],
+                "conversation": self.conversation.get_history()}
 
-    def _build_prompt(self):
-        # Compose prompt from conversation history
-        history = "\n".join([
-            f"User: {m['content']}" if m['role'] == 'user' else f"AI: {m['content']}"
-            for m in self.conversation.get_history()
-        ])
-        return f"{history}\nAI:"
+    def _document_excerpts(self, user_message):
+        # Only the chunks of the document that best match the request are sent, never the whole text
+        settings = retrieval_settings(self.config)
+        try:
+            from extension.tools.document_tools import get_relevant_chunks
+            chunks = get_relevant_chunks(user_message, settings["top_k"], settings["chunk_chars"])
+        except Exception:
+            # No Writer document (or no UNO bridge) to read from
+            return ""
+        if not chunks:
+            return ""
+        return f"Relevant excerpts from the document:\n{format_chunks(chunks)}\n\n"
+
+    def _next_step(self, prompt, tools, on_token, cancel_event):
+        if on_token is None and cancel_event is None:
+            return self.provider.generate_with_tools(prompt, tools)
+        if self.provider.supports_native_tools():
+            return self._stream_tool_reply(prompt, tools, on_token, cancel_event)
+        return parse_tool_calls(self._stream_response(tool_instructions(tools) + prompt, on_token, cancel_event))
+
+    def _stream_tool_reply(self, prompt, tools, on_token, cancel_event):
+        # Text is streamed to on_token as it arrives; structured tool calls follow it whole
+        chunks, calls = [], []
+        stream = self.provider.stream_with_tools(prompt, tools)
+        try:
+            for item in stream:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise RequestCancelled()
+                if isinstance(item, dict):
+                    calls.append(item)
+                    continue
+                chunks.append(item)
+                if on_token is not None:
+                    on_token(item)
+        finally:
+            stream.close()
+        return {"content": "".join(chunks), "tool_calls": calls}
 
-    def _is_tool_call(self, ai_response):
-        return ai_response.strip().startswith("{\"tool\":")
+    def _stream_response(self, prompt, on_token, cancel_event):
+        chunks = []
+        stream = self.provider.generate_stream(prompt)
+        try:
+            for chunk in stream:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise RequestCancelled()
+                chunks.append(chunk)
+                if on_token is not None:
+                    on_token(chunk)
+        finally:
+            # Closing the generator aborts the underlying HTTP stream
+            stream.close()
+        return "".join(chunks)
+
+    def _build_prompt(self):
+        # Compose prompt from conversation history, rendering only what changed since the last turn
+        for start, end, text in self._prompt_renderer.sync(self.conversation):
+            self._prompt_history = self._prompt_history[:start] + text + self._prompt_history[end:]
+        return f"{self._prompt_history}AI:"
 
-    def _parse_tool_call(self, ai_response):
-        import json
-        return json.loads(ai_response)
+    def _render_turn(self, m):
+        return f"User: {m['content']}\n" if m['role'] == 'user' else f"AI: {m['content']}\n"
 
     def _summarize(self, history):
         # Use the provider to summarize conversation history
@@ -51,7 +152,6 @@ class LibreAIMain:
 """
 LibreOffice Writer AI Extension Entry Point
 """
-import uno
 from extension.orchestrator import Orchestrator
 
 def run(*args):
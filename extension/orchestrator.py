@@ -1,5 +1,13 @@
 # Agentic tool dispatcher integration
-from extension.agentic_tools import call_tool
+import json
+import threading
+import time
+
+from extension.agentic_tools import call_tool, call_tools, select_tools, tool_schemas
+from extension.config import load_config
+from extension.llm_providers.provider_factory import get_provider_from_config
+from extension.token_counter import TokenCounter
+from extension.tools.document_retrieval import format_chunks, retrieval_settings
 
 def handle_agent_task(task_spec):
     """
@@ -13,27 +21,183 @@ def handle_agent_task(task_spec):
         return {"success": True, "result": result}
     except Exception as e:
         return {"success": False, "error": str(e)}
+
+def handle_agent_tasks(task_specs):
+    """
+    task_specs: list of dicts shaped like handle_agent_task's task_spec.
+    Runs all of them as one batched, single-undo edit and returns one result dict per task.
+    """
+    return call_tools(task_specs)
 """
 Agentic Orchestrator: Handles user requests, context extraction, and task specification.
 """
-from extension.agent import ToolAgent
-from extension.tools.document_tools import get_document_context
+# Per-task budgets for the agent loop; overridden by an "agent_loop" section in config.json
+DEFAULT_AGENT_LOOP_CONFIG = {"max_steps": 8, "deadline": 120.0, "token_budget": 30000}
 
-class Orchestrator:
+def agent_loop_settings(config):
+    settings = dict(DEFAULT_AGENT_LOOP_CONFIG)
+    settings.update(loop_budgets(config.get("agent_loop") or {}))
+    return settings
+
+def loop_budgets(constraints):
+    """The AgentLoop budgets among constraints; any other keys (e.g. the old max_retries) are ignored."""
+    return {key: value for key, value in constraints.items() if key in DEFAULT_AGENT_LOOP_CONFIG}
+
+class AgentMetrics:
+    """Steps-per-task, token and stop-reason totals over every AgentLoop run in the process."""
     def __init__(self):
-        self.agent = ToolAgent()
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.tasks = 0
+        self.steps = 0
+        self.tokens = 0
+        self.max_steps_per_task = 0
+        self.stop_reasons = {}
+
+    def record(self, outcome):
+        with self._lock:
+            self.tasks += 1
+            self.steps += outcome["steps"]
+            self.tokens += outcome["tokens"]
+            self.max_steps_per_task = max(self.max_steps_per_task, outcome["steps"])
+            self.stop_reasons[outcome["status"]] = self.stop_reasons.get(outcome["status"], 0) + 1
+
+    @property
+    def steps_per_task(self):
+        return self.steps / self.tasks if self.tasks else 0.0
+
+    def snapshot(self):
+        with self._lock:
+            return {"tasks": self.tasks, "steps": self.steps, "steps_per_task": self.steps_per_task,
+                    "max_steps_per_task": self.max_steps_per_task, "tokens": self.tokens,
+                    "stop_reasons": dict(self.stop_reasons)}
+
+metrics = AgentMetrics()
+
+class AgentLoop:
+    """
+    Plan-act-observe loop: ask the model for its next tool calls, run them, append the calls and
+    their results to the prompt, and ask again until the model answers without calling a tool.
+
+    step(prompt) returns a reply {"content", "tool_calls"} (see LLMProviderBase.generate_with_tools);
+    dispatch(calls) runs one step's calls and returns a result dict per call. The prompt is expected
+    to end with "AI:". A run also stops when max_steps model calls have been made, deadline seconds
+    have passed, or token_budget prompt and reply tokens have been spent.
+    """
+    def __init__(self, step, dispatch, max_steps=8, deadline=120.0, token_budget=30000, token_counter=None):
+        self.step = step
+        self.dispatch = dispatch
+        self.max_steps = max_steps
+        self.deadline = deadline
+        self.token_budget = token_budget
+        self.token_counter = token_counter or TokenCounter()
+
+    def run(self, prompt, cancel_event=None, prompt_tokens=None):
+        """
+        Returns {"status", "content", "tool_calls", "tool_results", "steps", "tokens", "elapsed"}; status is
+        "done", "max_steps", "deadline", "token_budget" or "cancelled". The run is added to metrics.
+
+        Each step is charged the task's part of the prompt, the calls and results fed back so far and
+        the reply. prompt_tokens is that part of prompt when the caller knows it: a conversation already
+        counted by its ConversationManager is then neither tokenized again nor charged on every step.
+        By default the whole prompt is counted.
+        """
+        started = time.monotonic()
+        count = self.token_counter.count
+        if prompt_tokens is None:
+            prompt_tokens = count(prompt)
+        transcript = ""
+        tool_calls = []
+        tool_results = []
+        content = ""
+        steps = tokens = 0
+        while True:
+            if cancel_event is not None and cancel_event.is_set():
+                status = "cancelled"
+            elif steps >= self.max_steps:
+                status = "max_steps"
+            elif time.monotonic() - started >= self.deadline:
+                status = "deadline"
+            elif tokens >= self.token_budget:
+                status = "token_budget"
+            else:
+                status = None
+            if status is not None:
+                break
+            reply = self.step(prompt + transcript)
+            steps += 1
+            calls = reply["tool_calls"]
+            content = reply["content"]
+            tokens += prompt_tokens + count(content + json.dumps(calls))
+            if not calls:
+                status = "done"
+                break
+            results = self.dispatch(calls)
+            tool_calls.extend(calls)
+            tool_results.extend(results)
+            # Feed the calls and what they returned back to the model as the next part of the prompt
+            observation = f" {json.dumps(calls)}\nTool results: {json.dumps(results, default=str)}\nAI:"
+            transcript += observation
+            prompt_tokens += count(observation)
+        outcome = {"status": status, "content": content, "tool_calls": tool_calls, "tool_results": tool_results,
+                   "steps": steps, "tokens": tokens, "elapsed": time.monotonic() - started}
+        metrics.record(outcome)
+        return outcome
+
+class Orchestrator:
+    def __init__(self, provider=None, config=None):
+        self.config = config if config is not None else load_config()
+        self._provider = provider
+
+    @property
+    def provider(self):
+        # Built on first use so creating the orchestrator does not load a LangChain client
+        if self._provider is None:
+            self._provider = get_provider_from_config(self.config)
+        return self._provider
 
     def start(self):
         # Entry point for the extension
         # TODO: Connect to UI and event loop
         pass
 
-    def handle_user_request(self, request):
-        context = get_document_context()
-        # For demo: extract a simple task spec
+    def handle_user_request(self, request, cancel_event=None):
+        # Deferred so importing the orchestrator does not load the UNO document tools
+        from extension.tools.document_tools import get_document_context
+        settings = retrieval_settings(self.config)
+        context = get_document_context(request, settings["top_k"], settings["chunk_chars"])
         task_spec = self.create_task_spec(request, context)
-        result = self.agent.execute_task(task_spec)
-        return result
+        return self.run_task(task_spec, cancel_event)
+
+    def run_task(self, task_spec, cancel_event=None):
+        """
+        Work on a task spec in an AgentLoop until the model is done or a budget in its constraints runs out.
+        Returns a dict with status, summary, errors and log, plus the steps taken and why the loop stopped.
+        """
+        tools = tool_schemas(select_tools(task_spec["description"]))
+        loop = AgentLoop(
+            step=lambda prompt: self.provider.generate_with_tools(prompt, tools),
+            dispatch=handle_agent_tasks,
+            token_counter=TokenCounter(self.config.get("model_name")),
+            **loop_budgets(task_spec.get("constraints") or {}))
+        outcome = loop.run(self._task_prompt(task_spec), cancel_event)
+        errors = [r["error"] for r in outcome["tool_results"] if not r["success"]]
+        log = [f"{call['tool']}({call.get('args', {})}): {'ok' if result['success'] else result['error']}"
+               for call, result in zip(outcome["tool_calls"], outcome["tool_results"])]
+        if outcome["status"] == "done":
+            summary = outcome["content"] or "Task executed successfully."
+        else:
+            summary = f"Stopped after {outcome['steps']} steps ({outcome['status']})."
+        return {
+            "status": "success" if outcome["status"] == "done" and not errors else "failure",
+            "summary": summary,
+            "errors": errors,
+            "log": log,
+            "steps": outcome["steps"],
+            "stop_reason": outcome["status"],
+        }
 
     def create_task_spec(self, request, context):
         # Example: create a structured task spec
@@ -42,6 +206,14 @@ class Orchestrator:
             "task_id": "1",
             "description": request,
             "document_context": context,
-            "constraints": {"max_retries": 3},
+            "constraints": agent_loop_settings(self.config),
             "rationale": "User request parsed by orchestrator."
         }
+
+    def _task_prompt(self, task_spec):
+        context = dict(task_spec["document_context"])
+        excerpts = context.pop("excerpts", None)
+        prompt = f"Document context: {json.dumps(context, default=str)}\n"
+        if excerpts:
+            prompt += f"Relevant excerpts from the document:\n{format_chunks(excerpts)}\n\n"
+        return prompt + f"User: {task_spec['description']}\nAI:"
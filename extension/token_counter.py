@@ -0,0 +1,65 @@
+"""
+Token counting shared by the conversation managers.
+
+tiktoken encodings are loaded once per process and chosen by model name. Counting
+can also be approximate: estimates come from a characters-per-token ratio that is
+calibrated against every exact count made.
+"""
+import threading
+
+# Try to import tiktoken, otherwise use a fallback estimator
+try:
+    import tiktoken
+    _TIKTOKEN_AVAILABLE = True
+except ImportError:
+    tiktoken = None
+    _TIKTOKEN_AVAILABLE = False
+
+DEFAULT_ENCODING = "cl100k_base"
+# OpenAI heuristic: 1 token ≈ 4 characters
+DEFAULT_CHARS_PER_TOKEN = 4.0
+
+_encodings = {}
+_encodings_lock = threading.Lock()
+
+
+def get_encoding(model_name=None):
+    """Return the process-wide tiktoken encoding for model_name, or None without tiktoken."""
+    if not _TIKTOKEN_AVAILABLE:
+        return None
+    with _encodings_lock:
+        if model_name not in _encodings:
+            encoding = None
+            if model_name:
+                try:
+                    encoding = tiktoken.encoding_for_model(model_name)
+                except KeyError:
+                    # Not an OpenAI model; cl100k_base is a reasonable approximation
+                    encoding = None
+            _encodings[model_name] = encoding or tiktoken.get_encoding(DEFAULT_ENCODING)
+        return _encodings[model_name]
+
+
+class TokenCounter:
+    def __init__(self, model_name=None):
+        self.encoding = get_encoding(model_name)
+        self._chars = 0  # Characters and tokens seen by exact counts, for calibration
+        self._tokens = 0
+
+    @property
+    def chars_per_token(self):
+        if self._tokens == 0:
+            return DEFAULT_CHARS_PER_TOKEN
+        return self._chars / self._tokens
+
+    def estimate(self, text):
+        return max(1, int(len(text) / self.chars_per_token))
+
+    def count(self, text):
+        """Exact count with tiktoken; falls back to the estimate when it is not installed."""
+        if self.encoding is None:
+            return self.estimate(text)
+        tokens = len(self.encoding.encode(text))
+        self._chars += len(text)
+        self._tokens += tokens
+        return tokens
@@ -0,0 +1,256 @@
+"""
+Per-document caches for the document tools.
+
+Walking a Writer document over the UNO bridge is expensive, so the tools keep
+a little derived state about the open document and throw it away whenever the
+document is modified by anyone other than the tools themselves.
+"""
+from bisect import bisect_right
+from contextlib import contextmanager
+
+import unohelper
+from com.sun.star.util import XModifyListener
+
+from extension.tools.document_index import DocumentIndex
+
+
+class ParagraphIndex:
+    """Handles and cumulative character offsets of the top-level paragraphs of a document.
+
+    ``elements`` is the paragraph handle table used by the paragraph-indexed
+    tools; it counts tables like ``doc.Text.createEnumeration()`` does.
+
+    Offsets follow the convention of ``XTextCursor.goRight`` from the start of
+    the body text: every paragraph break counts as one character and tables
+    contribute nothing.
+    """
+
+    def __init__(self):
+        self.elements = []  # Every top-level text content (paragraphs and tables), in document order
+        self.paragraphs = []  # UNO paragraph objects, in document order
+        self.starts = []  # Offset of the first character of each paragraph
+        self.lengths = []  # Number of characters in each paragraph
+
+    @classmethod
+    def build(cls, doc):
+        index = cls()
+        enum = doc.Text.createEnumeration()
+        while enum.hasMoreElements():
+            element = enum.nextElement()
+            if element.supportsService("com.sun.star.text.Paragraph"):
+                index.add(element, element.getString())
+            else:
+                index.add(element)
+        return index
+
+    def add(self, element, text=None):
+        """Append the next top-level element; ``text`` is None for anything but a paragraph."""
+        self.elements.append(element)
+        if text is None:
+            return
+        self.starts.append(self.starts[-1] + self.lengths[-1] + 1 if self.starts else 0)
+        self.paragraphs.append(element)
+        self.lengths.append(len(text))
+
+    def element(self, paragraph_index):
+        """Return the top-level text content at ``paragraph_index``, or None if out of range."""
+        if 0 <= paragraph_index < len(self.elements):
+            return self.elements[paragraph_index]
+        return None
+
+    def locate(self, offset):
+        """Return (paragraph number, offset within that paragraph) for a document offset."""
+        if not self.starts:
+            return None, offset
+        i = max(bisect_right(self.starts, offset) - 1, 0)
+        return i, offset - self.starts[i]
+
+    def cursor_at(self, doc, offset):
+        """Create a collapsed text cursor at a document offset."""
+        i, local = self.locate(offset)
+        if i is None:
+            cursor = doc.Text.createTextCursor()
+        else:
+            cursor = doc.Text.createTextCursorByRange(self.paragraphs[i].getStart())
+        if local:
+            cursor.goRight(local, False)
+        return cursor
+
+    def cursor_for_range(self, doc, start, end):
+        """Create a text cursor selecting the characters between two document offsets."""
+        cursor = self.cursor_at(doc, start)
+        first, _ = self.locate(start)
+        last, _ = self.locate(end)
+        if first == last:
+            cursor.goRight(end - start, True)
+        else:
+            cursor.gotoRange(self.cursor_at(doc, end), True)
+        return cursor
+
+    def shift(self, position, delta):
+        """Account for ``delta`` characters inserted (or removed, if negative) at ``position``.
+
+        Returns False when the change crosses a paragraph boundary and the index
+        can no longer be patched in place.
+        """
+        i, local = self.locate(position)
+        if i is None:
+            return False
+        if delta < 0 and local - delta > self.lengths[i]:
+            return False
+        self.lengths[i] += delta
+        for j in range(i + 1, len(self.starts)):
+            self.starts[j] += delta
+        return True
+
+
+class DocumentSnapshot:
+    """Everything the read-only analysis tools report, gathered in one enumeration."""
+
+    def __init__(self):
+        self.paragraphs = []  # {"index", "text", "style"} for every top-level element
+        self.headings = []  # The subset of paragraphs using a "Heading" style
+        self.word_count = 0
+        self.tables = []
+        self.images = []
+        self.paragraph_index = ParagraphIndex()
+
+    @property
+    def paragraph_count(self):
+        return len(self.paragraphs)
+
+    @classmethod
+    def build(cls, doc):
+        snapshot = cls()
+        enum = doc.Text.createEnumeration()
+        idx = 0
+        while enum.hasMoreElements():
+            element = enum.nextElement()
+            if element.supportsService("com.sun.star.text.Paragraph"):
+                text = element.getString()
+                style = element.ParaStyleName or ""
+                snapshot.paragraph_index.add(element, text)
+                snapshot.word_count += len(text.split())
+            else:
+                text, style = "", ""
+                snapshot.paragraph_index.add(element)
+            entry = {"index": idx, "text": text, "style": style}
+            snapshot.paragraphs.append(entry)
+            if style.startswith("Heading"):
+                snapshot.headings.append(entry)
+            idx += 1
+        snapshot.tables = list(doc.getTextTables().getElementNames())
+        snapshot.images = list(doc.getGraphicObjects().getElementNames())
+        return snapshot
+
+
+class _ModifyListener(unohelper.Base, XModifyListener):
+    def __init__(self, cache):
+        self.cache = cache
+
+    def modified(self, event):
+        self.cache.generation += 1
+
+    def disposing(self, event):
+        self.cache.listening = False
+
+
+class DocumentCache:
+    """Derived state for one document, invalidated through an XModifyListener."""
+
+    def __init__(self, doc):
+        self.doc = doc
+        self.generation = 0
+        self.listening = False
+        self._paragraph_index = None
+        self._index_generation = -1
+        self._snapshot = None
+        self._snapshot_generation = -1
+        self._document_index = None
+        self._listener = _ModifyListener(self)
+        try:
+            doc.addModifyListener(self._listener)
+            self.listening = True
+        except Exception:
+            # Without notifications nothing can be trusted between calls
+            self.listening = False
+
+    def close(self):
+        if self._document_index is not None:
+            self._document_index.close()
+        if self.listening:
+            try:
+                self.doc.removeModifyListener(self._listener)
+            except Exception:
+                pass
+            self.listening = False
+
+    def _index_is_fresh(self):
+        return (self.listening and self._paragraph_index is not None
+                and self._index_generation == self.generation)
+
+    def paragraph_index(self):
+        if not self._index_is_fresh():
+            self._paragraph_index = ParagraphIndex.build(self.doc)
+            self._index_generation = self.generation
+        return self._paragraph_index
+
+    def snapshot(self):
+        """Return a snapshot of the document, rebuilt only after it has been modified."""
+        if not (self.listening and self._snapshot is not None
+                and self._snapshot_generation == self.generation):
+            self._snapshot = DocumentSnapshot.build(self.doc)
+            self._snapshot_generation = self.generation
+            # The enumeration also produced a fresh paragraph index
+            self._paragraph_index = self._snapshot.paragraph_index
+            self._index_generation = self.generation
+        return self._snapshot
+
+    def document_index(self, chunk_chars=1500):
+        """Return the incrementally maintained retrieval index of the document."""
+        if self._document_index is None or self._document_index.chunk_chars != chunk_chars:
+            if self._document_index is not None:
+                self._document_index.close()
+            self._document_index = DocumentIndex(self.doc, chunk_chars)
+        return self._document_index
+
+    def invalidate(self):
+        self._paragraph_index = None
+
+    @contextmanager
+    def editing(self, position=None, delta=0, structural=False, paragraph=None):
+        """Wrap an edit made by the tools so the caches survive it when possible.
+
+        Pass the insertion point and the change in length for plain text edits,
+        or ``structural=True`` when paragraphs may have been added or removed.
+        ``paragraph`` names the paragraph whose properties an edit changes.
+        """
+        fresh = self._index_is_fresh()
+        yield
+        if self._document_index is not None:
+            if structural:
+                self._document_index.mark_stale()
+            elif paragraph is not None:
+                self._document_index.mark_paragraph(paragraph)
+            elif position is not None:
+                self._document_index.mark_offset(position)
+        if not fresh or structural:
+            self.invalidate()
+            return
+        if delta and not self._paragraph_index.shift(position, delta):
+            self.invalidate()
+            return
+        self._index_generation = self.generation
+
+
+_cache = None
+
+
+def get_cache(doc):
+    """Return the cache for ``doc``, replacing the cache of any previous document."""
+    global _cache
+    if _cache is None or (_cache.doc is not doc and _cache.doc != doc):
+        if _cache is not None:
+            _cache.close()
+        _cache = DocumentCache(doc)
+    return _cache
@@ -0,0 +1,285 @@
+"""
+Incrementally maintained retrieval index for the open document.
+
+Building the index means walking every paragraph over the UNO bridge, which is slow on
+long documents. So the index is built once and then kept up to date paragraph by
+paragraph. An XModifyListener marks the paragraph under the view cursor as dirty
+whenever the document changes. Edits made by the tools mark their own paragraphs. On
+the next query only the dirty paragraphs are read again. If the paragraph structure
+around them changed, or the change could not be located, the index is rebuilt.
+
+Queries run on the request worker thread while the listener is called on the UI
+thread as the user types, so the marks are taken under a lock and marks that arrive
+while the index is being read are kept for the next query.
+"""
+import threading
+from bisect import bisect_left
+from itertools import accumulate
+
+import unohelper
+from com.sun.star.util import XModifyListener
+
+from extension.tools.document_retrieval import BM25Index, chunk_paragraphs
+
+
+class _IndexListener(unohelper.Base, XModifyListener):
+    def __init__(self, index):
+        self.index = index
+
+    def modified(self, event):
+        self.index.mark_view_cursor()
+
+    def disposing(self, event):
+        self.index.listening = False
+
+
+class DocumentIndex:
+    """BM25 index over the chunks of a document (see document_retrieval), refreshed lazily."""
+
+    def __init__(self, doc, chunk_chars=1500):
+        self.doc = doc
+        self.chunk_chars = chunk_chars
+        self.elements = []  # Top-level text contents (paragraphs and tables), in document order
+        self.entries = []  # {"index", "text", "style"} for each element; tables have empty text
+        self.is_paragraph = []
+        self.paragraph_elements = []  # Element numbers of the paragraphs, ascending
+        self.chunk_of = []  # Chunk number of each element, None if it is in no chunk
+        self.chunks = []
+        self.bm25 = BM25Index([])
+        self.table_count = 0
+        self.dirty = set()  # Element numbers of paragraphs to read again
+        self.stale = True  # Everything must be rebuilt
+        self.stats = {"rebuilds": 0, "reindexed": 0}
+        self._lock = threading.Lock()  # Guards dirty, stale and the two flags below
+        self._rebuilding = False
+        self._cursor_pending = False  # The document changed during a rebuild; locate the cursor after it
+        self._last_located = None  # The paragraph found by the previous lookup; typing tends to stay there
+        self._listener = _IndexListener(self)
+        try:
+            doc.addModifyListener(self._listener)
+            self.listening = True
+        except Exception:
+            # Without notifications every query rebuilds the index
+            self.listening = False
+
+    def close(self):
+        if self.listening:
+            try:
+                self.doc.removeModifyListener(self._listener)
+            except Exception:
+                pass
+            self.listening = False
+
+    def mark_stale(self):
+        with self._lock:
+            self.stale = True
+
+    def mark_paragraph(self, element_number):
+        with self._lock:
+            if 0 <= element_number < len(self.elements) and self.is_paragraph[element_number]:
+                self.dirty.add(element_number)
+            else:
+                self.stale = True
+
+    def mark_offset(self, offset):
+        """Mark the paragraph containing a document offset (as used by the editing tools)."""
+        if self.dirty:
+            # Offsets are counted over the texts last read, so paragraphs changed since are read first
+            self._catch_up()
+        if self.stale:
+            return
+        starts = self._paragraph_starts()
+        lo, hi = 0, len(self.paragraph_elements)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if starts[mid] <= offset:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == 0:
+            self.mark_stale()
+        else:
+            self.mark_paragraph(self.paragraph_elements[lo - 1])
+
+    def mark_view_cursor(self):
+        """Mark the paragraph holding the view cursor, or the whole index if it cannot be found."""
+        with self._lock:
+            if self._rebuilding:
+                # The paragraphs are being read again; the edit is located once they all are
+                self._cursor_pending = True
+                return
+            if self.stale:
+                return
+        try:
+            position = self.doc.CurrentController.getViewCursor().getStart()
+            self.mark_paragraph(self._locate(position))
+        except Exception:
+            # The cursor is outside the body text (table, frame, header) or a paragraph is gone
+            self.mark_stale()
+
+    def _starts_at_or_before(self, element_number, position):
+        start = self.elements[element_number].getStart()
+        return self.doc.Text.compareRegionStarts(start, position) >= 0
+
+    def _locate(self, position):
+        """Element number of the paragraph containing position, by bisection over paragraph starts."""
+        paragraphs = self.paragraph_elements
+        last = self._last_located
+        if last is not None and last < len(paragraphs) and self._starts_at_or_before(paragraphs[last], position):
+            if last + 1 == len(paragraphs) or not self._starts_at_or_before(paragraphs[last + 1], position):
+                return paragraphs[last]
+        lo, hi = 0, len(paragraphs)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._starts_at_or_before(paragraphs[mid], position):
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == 0:
+            raise ValueError("position is before the first paragraph")
+        self._last_located = lo - 1
+        return paragraphs[lo - 1]
+
+    def refresh(self):
+        """Bring the index up to date, reading only dirty paragraphs when the structure is unchanged."""
+        self._catch_up()
+        if self.stale:
+            self._rebuild()
+
+    def _catch_up(self):
+        # Read the dirty paragraphs again, or mark the index stale if that is not enough
+        if not self.listening:
+            self.stale = True
+        if not self.stale:
+            try:
+                if self.doc.getTextTables().getCount() != self.table_count:
+                    self.stale = True
+                else:
+                    self._reindex_dirty()
+            except Exception:
+                self.stale = True
+
+    def _rebuild(self):
+        with self._lock:
+            # Anything marked from here on is read by this rebuild or left for the next one
+            self._rebuilding, self._cursor_pending = True, False
+            self.dirty, self.stale = set(), False
+        try:
+            self._read_all()
+        except Exception:
+            self.mark_stale()
+            raise
+        finally:
+            with self._lock:
+                self._rebuilding = False
+                pending = self._cursor_pending
+        if pending:
+            self.mark_view_cursor()
+
+    def _read_all(self):
+        self.elements, self.entries, self.is_paragraph = [], [], []
+        enum = self.doc.Text.createEnumeration()
+        while enum.hasMoreElements():
+            element = enum.nextElement()
+            is_paragraph = element.supportsService("com.sun.star.text.Paragraph")
+            text = element.getString() if is_paragraph else ""
+            style = (element.ParaStyleName or "") if is_paragraph else ""
+            self.entries.append({"index": len(self.elements), "text": text, "style": style})
+            self.elements.append(element)
+            self.is_paragraph.append(is_paragraph)
+        self.paragraph_elements = [i for i, p in enumerate(self.is_paragraph) if p]
+        self.table_count = self.doc.getTextTables().getCount()
+        self._rechunk()
+        self._last_located = None
+        self.stats["rebuilds"] += 1
+
+    def _rechunk(self):
+        # Re-chunking works on the texts already read, so it costs no UNO calls
+        tables = {i for i, is_paragraph in enumerate(self.is_paragraph) if not is_paragraph}
+        self.chunks = chunk_paragraphs(self.entries, self.chunk_chars, tables)
+        self.chunk_of = [None] * len(self.entries)
+        for number, chunk in enumerate(self.chunks):
+            for i in range(chunk["first"], chunk["last"] + 1):
+                self.chunk_of[i] = number
+        self.bm25 = BM25Index(self.chunks)
+
+    def _next_paragraph_is(self, element_number, expected):
+        """True if the paragraph after element_number in the document is element expected (None: no next one)."""
+        cursor = self.doc.Text.createTextCursorByRange(self.elements[element_number].getStart())
+        if not cursor.gotoNextParagraph(False):
+            return expected is None
+        if expected is None:
+            return False
+        return self.doc.Text.compareRegionStarts(cursor.getStart(), self.elements[expected].getStart()) == 0
+
+    def _neighbours(self, element_number):
+        position = bisect_left(self.paragraph_elements, element_number)
+        previous = self.paragraph_elements[position - 1] if position else None
+        following = self.paragraph_elements[position + 1] if position + 1 < len(self.paragraph_elements) else None
+        return previous, following
+
+    def _reindex_dirty(self):
+        rechunk = False
+        changed_chunks = set()
+        with self._lock:
+            dirty, self.dirty = self.dirty, set()
+        for i in sorted(dirty):
+            previous, following = self._neighbours(i)
+            # A paragraph split or merge shows up as a broken link to a neighbour
+            if not self._next_paragraph_is(i, following) or (previous is not None and not self._next_paragraph_is(previous, i)):
+                self.mark_stale()
+                return
+            entry = self.entries[i]
+            text = self.elements[i].getString()
+            style = self.elements[i].ParaStyleName or ""
+            if (style.startswith("Heading") or entry["style"].startswith("Heading")
+                    or bool(text.strip()) != bool(entry["text"].strip())):
+                rechunk = True  # Chunk boundaries or headings change
+            entry["text"], entry["style"] = text, style
+            if self.chunk_of[i] is not None:
+                changed_chunks.add(self.chunk_of[i])
+            self.stats["reindexed"] += 1
+        if rechunk:
+            self._rechunk()
+            return
+        for number in changed_chunks:
+            chunk = self.chunks[number]
+            # Chunks never span a table, so this is every paragraph in the chunk, as chunk_paragraphs joins them
+            chunk["text"] = "\n".join(self.entries[i]["text"] for i in range(chunk["first"], chunk["last"] + 1))
+            self.bm25.replace(number, chunk)
+
+    def _paragraph_starts(self):
+        # Offsets follow ParagraphIndex: one character per paragraph break, none for tables
+        lengths = [len(self.entries[i]["text"]) + 1 for i in self.paragraph_elements]
+        return [0] + list(accumulate(lengths))[:-1]
+
+    def _verify(self, first, last):
+        """Mark paragraphs from element first to last whose text changed without the change being located."""
+        for i in range(first, last + 1):
+            if self.is_paragraph[i] and self.elements[i].getString() != self.entries[i]["text"]:
+                self.mark_paragraph(i)
+
+    def search(self, query, k=5):
+        """Return up to k (score, chunk) pairs for query, best first, with current document offsets."""
+        self.refresh()
+        hits = self.bm25.search(query, k)
+        # Edits away from the view cursor (replace all, undo, other macros) go unnoticed, so the
+        # text about to be sent, and every paragraph its offsets are counted over, is checked
+        # and the search repeated while any of it changed
+        for _ in range(3):
+            try:
+                self._verify(0, max((chunk["last"] for _, chunk in hits), default=-1))
+            except Exception:
+                self.stale = True
+            if not self.dirty and not self.stale:
+                break
+            self.refresh()
+            hits = self.bm25.search(query, k)
+        # Unless the document kept changing, every paragraph up to the last hit has been read back
+        starts = dict(zip(self.paragraph_elements, self._paragraph_starts()))
+        results = []
+        for score, chunk in hits:
+            result = dict(chunk)
+            result["start"] = starts.get(chunk["first"])
+            results.append((score, result))
+        return results
@@ -0,0 +1,148 @@
+"""
+Lexical retrieval over the open document.
+
+The document is split into chunks along headings and paragraph boundaries, and the
+chunks are ranked against a request with BM25. Only the best few chunks go into the
+prompt, so long documents no longer have to be sent whole.
+"""
+import math
+import re
+from collections import Counter
+
+DEFAULT_RETRIEVAL_CONFIG = {"top_k": 5, "chunk_chars": 1500}
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were will with "
+    "i me my we our you your he she they them his her their do does did not no can could should would "
+    "please make into about".split())
+
+
+def retrieval_settings(config):
+    settings = dict(DEFAULT_RETRIEVAL_CONFIG)
+    settings.update(config.get("retrieval") or {})
+    return settings
+
+
+def _stem(word):
+    # Just enough suffix stripping for "starts", "starting" and "started" to match "start"
+    for suffix in ("ing", "ed", "s"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3 and not word.endswith("ss"):
+            return word[:-len(suffix)]
+    return word
+
+
+def tokenize(text):
+    return [_stem(w) for w in _WORD.findall(text.lower()) if len(w) > 1 and w not in _STOPWORDS]
+
+
+def chunk_paragraphs(paragraphs, max_chars=1500, tables=()):
+    """
+    Group paragraphs ({"index", "text", "style"} entries, as in DocumentSnapshot) into chunks. A heading
+    starts a new chunk and a chunk is closed once it holds max_chars characters; tables holds the indexes
+    of entries that are not paragraphs, which close the chunk too. Returns {"heading", "first", "last",
+    "start", "text"} dicts; first and last are paragraph indexes, and start, the document offset of the
+    chunk, is left for the index to fill in as it changes with every edit.
+
+    The text of a chunk is its paragraphs from first to last joined with "\n", blank ones included, so an
+    offset within it plus start is a document offset.
+    """
+    chunks = []
+    current = None
+    heading = ""
+    blanks = []  # Blank paragraphs since the current chunk's last one, added if it goes on
+    for entry in paragraphs:
+        if entry["index"] in tables:
+            current, blanks = None, []
+            continue
+        text = entry["text"]
+        is_heading = entry["style"].startswith("Heading")
+        if is_heading:
+            heading = text
+        if not text.strip():
+            if current is not None:
+                blanks.append(text)
+            continue
+        if current is None or is_heading or len(current["text"]) >= max_chars:
+            current = {"heading": heading, "first": entry["index"], "last": entry["index"],
+                       "start": None, "text": text}
+            chunks.append(current)
+        else:
+            current["last"] = entry["index"]
+            current["text"] = "\n".join([current["text"]] + blanks + [text])
+        blanks = []
+    return chunks
+
+
+class BM25Index:
+    """Okapi BM25 over a list of chunks; a chunk's heading counts towards its terms."""
+
+    def __init__(self, chunks, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.chunks = []
+        self.term_counts = []  # Counter of terms for each chunk
+        self.lengths = []  # Number of terms in each chunk
+        self.doc_freq = Counter()  # Number of chunks containing each term
+        self.total_length = 0
+        for chunk in chunks:
+            self.add(chunk)
+
+    def add(self, chunk):
+        terms = Counter(tokenize(chunk["text"]))
+        if chunk["heading"] and not chunk["text"].startswith(chunk["heading"]):
+            terms.update(tokenize(chunk["heading"]))
+        self.chunks.append(chunk)
+        self.term_counts.append(terms)
+        self.doc_freq.update(terms.keys())
+        self.lengths.append(sum(terms.values()))
+        self.total_length += self.lengths[-1]
+
+    def replace(self, i, chunk):
+        """Swap in a new version of chunk i, adjusting the collection statistics."""
+        old_terms = self.term_counts[i]
+        self.doc_freq.subtract(old_terms.keys())
+        self.total_length -= self.lengths[i]
+        terms = Counter(tokenize(chunk["text"]))
+        if chunk["heading"] and not chunk["text"].startswith(chunk["heading"]):
+            terms.update(tokenize(chunk["heading"]))
+        self.chunks[i] = chunk
+        self.term_counts[i] = terms
+        self.doc_freq.update(terms.keys())
+        self.lengths[i] = sum(terms.values())
+        self.total_length += self.lengths[i]
+
+    def score(self, query_terms, i):
+        terms = self.term_counts[i]
+        n = len(self.chunks)
+        average = self.total_length / n or 1
+        score = 0.0
+        for term in query_terms:
+            tf = terms.get(term, 0)
+            if not tf:
+                continue
+            df = self.doc_freq[term]
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            score += idf * tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * self.lengths[i] / average))
+        return score
+
+    def search(self, query, k=5):
+        """Return up to k (score, chunk) pairs that share a term with query, best first."""
+        query_terms = set(tokenize(query))
+        if not query_terms or not self.chunks:
+            return []
+        scored = [(self.score(query_terms, i), i) for i in range(len(self.chunks))]
+        scored = sorted((s for s in scored if s[0] > 0), key=lambda s: (-s[0], s[1]))[:k]
+        return [(score, self.chunks[i]) for score, i in scored]
+
+
+def format_chunks(chunks):
+    """Render chunks for a prompt, labelled with their paragraph indexes and document offset."""
+    lines = []
+    for chunk in chunks:
+        span = f"{chunk['first']}" if chunk["first"] == chunk["last"] else f"{chunk['first']}-{chunk['last']}"
+        label = f"[paragraphs {span}, offset {chunk['start']}]"
+        if chunk["heading"] and not chunk["text"].startswith(chunk["heading"]):
+            label += f" (under \"{chunk['heading']}\")"
+        lines.append(f"{label}\n{chunk['text']}")
+    return "\n\n".join(lines)
@@ -0,0 +1,109 @@
+"""
+Document session: resolves the active document model once and keeps it current.
+
+Looking up the Desktop and its current component costs several UNO round trips,
+which add up when LibreOffice runs headless behind a socket. The session does
+that lookup once, then follows focus changes and document closes through the
+global document event broadcaster.
+"""
+import threading
+
+import uno
+import unohelper
+from com.sun.star.document import XDocumentEventListener
+
+
+class _ActiveDocumentListener(unohelper.Base, XDocumentEventListener):
+    def __init__(self, session):
+        self.session = session
+
+    def documentEventOccured(self, event):
+        name = event.EventName
+        if name == "OnFocus":
+            self.session.set_model(event.Source)
+        elif name in ("OnPrepareUnload", "OnUnload", "OnViewClosed"):
+            self.session.forget_model(event.Source)
+
+    def disposing(self, event):
+        self.session.reset()
+
+
+class DocumentSession:
+    """Caches the Desktop and the active document model across tool calls."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._desktop = None
+        self._model = None
+        self._broadcaster = None
+        self._listener = None
+        self.stats = {"lookups": 0, "reused": 0}
+
+    def get_model(self):
+        """Return the active document model, asking the Desktop only when nothing is cached."""
+        model = self._model
+        if model is not None:
+            self.stats["reused"] += 1
+            return model
+        with self._lock:
+            if self._model is not None:
+                self.stats["reused"] += 1
+                return self._model
+            model = self._lookup_model()
+            self.stats["lookups"] += 1
+            if self._listener is not None:
+                self._model = model
+            return model
+
+    def _lookup_model(self):
+        if self._desktop is None:
+            ctx = uno.getComponentContext()
+            smgr = ctx.ServiceManager
+            self._desktop = smgr.createInstanceWithContext("com.sun.star.frame.Desktop", ctx)
+            self._start_listening(ctx, smgr)
+        return self._desktop.getCurrentComponent()
+
+    def _start_listening(self, ctx, smgr):
+        try:
+            broadcaster = smgr.createInstanceWithContext("com.sun.star.frame.GlobalEventBroadcaster", ctx)
+            listener = _ActiveDocumentListener(self)
+            broadcaster.addDocumentEventListener(listener)
+        except Exception:
+            # Without events the cached model could go stale; keep asking the Desktop
+            return
+        self._broadcaster = broadcaster
+        self._listener = listener
+
+    def set_model(self, model):
+        if self._listener is not None:
+            self._model = model
+
+    def forget_model(self, model):
+        current = self._model
+        if current is not None and (current is model or current == model):
+            self._model = None
+
+    def reset(self):
+        """Drop the cached model and stop listening; the next lookup starts afresh."""
+        with self._lock:
+            if self._listener is not None:
+                try:
+                    self._broadcaster.removeDocumentEventListener(self._listener)
+                except Exception:
+                    pass
+            self._desktop = None
+            self._model = None
+            self._broadcaster = None
+            self._listener = None
+
+    @property
+    def listening(self):
+        return self._listener is not None
+
+
+_session = DocumentSession()
+
+
+def get_session():
+    """Return the process-wide document session shared by every tool."""
+    return _session
@@ -1,4 +1,4 @@
-from typing import List, Tuple, Dict
+from typing import List, Optional, Tuple, Dict
 # --- Search & Analysis ---
 def find_text(query: str, match_case: bool = False, whole_words: bool = False) -> List[Tuple[int, int]]:
     doc = get_document()
@@ -17,16 +17,11 @@ def find_text(query: str, match_case: bool = False, whole_words: bool = False) -
 
 def count_words() -> int:
     doc = get_document()
-    return len(doc.Text.getString().split())
+    return get_cache(doc).snapshot().word_count
 
 def count_paragraphs() -> int:
     doc = get_document()
-    enum = doc.Text.createEnumeration()
-    count = 0
-    while enum.hasMoreElements():
-        enum.nextElement()
-        count += 1
-    return count
+    return get_cache(doc).snapshot().paragraph_count
 # --- Undo, Redo, and Document Management ---
 def undo_last_action() -> bool:
     try:
@@ -56,16 +51,15 @@ def save_document() -> bool:
     except UnoException:
         return False
 # --- Sections, Headers, and Footers ---
-def insert_section(name: str, position = None) -> bool:
+def insert_section(name: str, position: Optional[int] = None) -> bool:
     try:
         doc = get_document()
         text = doc.Text
-        cursor = text.createTextCursor()
-        if position is not None:
-            cursor.goRight(position, False)
+        cursor = _cursor_at(doc, position) if position is not None else text.createTextCursor()
         section = doc.createInstance("com.sun.star.text.TextSection")
         section.setName(name)
-        text.insertTextContent(cursor, section, False)
+        with get_cache(doc).editing(structural=True):
+            text.insertTextContent(cursor, section, False)
         return True
     except UnoException:
         return False
@@ -104,46 +98,22 @@ def set_footer(text: str, page_style: str = 'Default') -> bool:
 # --- Document Structure & Navigation ---
 def get_document_structure() -> Dict:
     doc = get_document()
-    structure = {"headings": [], "paragraphs": [], "tables": [], "images": []}
+    snapshot = get_cache(doc).snapshot()
+    structure = {"headings": [], "paragraphs": [], "tables": list(snapshot.tables), "images": list(snapshot.images)}
     # Headings and paragraphs
-    enum = doc.Text.createEnumeration()
-    idx = 0
-    while enum.hasMoreElements():
-        para = enum.nextElement()
-        style = getattr(para, 'ParaStyleName', '')
-        text = para.getString()
-        if style.startswith("Heading"):
-            structure["headings"].append({"index": idx, "text": text, "style": style})
-        else:
-            structure["paragraphs"].append({"index": idx, "text": text, "style": style})
-        idx += 1
-    # Tables
-    tables = doc.getTextTables()
-    for name in tables.getElementNames():
-        structure["tables"].append(name)
-    # Images
-    graphics = doc.getGraphicObjects()
-    for name in graphics.getElementNames():
-        structure["images"].append(name)
+    for entry in snapshot.paragraphs:
+        key = "headings" if entry["style"].startswith("Heading") else "paragraphs"
+        structure[key].append(dict(entry))
     return structure
 
 def get_text(start: int, end: int) -> str:
     doc = get_document()
-    cursor = doc.Text.createTextCursor()
-    cursor.goRight(start, False)
-    cursor.goRight(end - start, True)
-    return cursor.getString()
+    return _range_cursor(doc, start, end).getString()
 
 def get_paragraph_text(paragraph_index: int) -> str:
     doc = get_document()
-    enum = doc.Text.createEnumeration()
-    idx = 0
-    while enum.hasMoreElements():
-        para = enum.nextElement()
-        if idx == paragraph_index:
-            return para.getString()
-        idx += 1
-    return ""
+    para = get_cache(doc).paragraph_index().element(paragraph_index)
+    return para.getString() if para is not None else ""
 
 def get_current_cursor_position() -> int:
     doc = get_document()
@@ -154,19 +124,17 @@ def move_cursor_to_position(position: int) -> bool:
     try:
         doc = get_document()
         view_cursor = doc.CurrentController.getViewCursor()
-        view_cursor.gotoStart(False)
-        view_cursor.goRight(position, False)
+        view_cursor.gotoRange(_cursor_at(doc, position), False)
         return True
     except UnoException:
         return False
 # --- Images ---
-def insert_image(image_path: str, position = None, width = None, height = None) -> bool:
+def insert_image(image_path: str, position: Optional[int] = None, width: Optional[int] = None,
+                 height: Optional[int] = None) -> bool:
     try:
         doc = get_document()
         text = doc.Text
-        cursor = text.createTextCursor()
-        if position is not None:
-            cursor.goRight(position, False)
+        cursor = _cursor_at(doc, position) if position is not None else text.createTextCursor()
         graphic = doc.createInstance("com.sun.star.text.TextGraphicObject")
         graphic.GraphicURL = uno.systemPathToFileUrl(image_path)
         if width:
@@ -191,16 +159,16 @@ def delete_image(image_index: int) -> bool:
     except UnoException:
         return False
 # --- Tables ---
-def insert_table(rows: int, columns: int, position = None, data = None) -> bool:
+def insert_table(rows: int, columns: int, position: Optional[int] = None,
+                 data: Optional[List[List[str]]] = None) -> bool:
     try:
         doc = get_document()
         text = doc.Text
-        cursor = text.createTextCursor()
-        if position is not None:
-            cursor.goRight(position, False)
+        cursor = _cursor_at(doc, position) if position is not None else text.createTextCursor()
         table = doc.createInstance("com.sun.star.text.TextTable")
         table.initialize(rows, columns)
-        text.insertTextContent(cursor, table, False)
+        with get_cache(doc).editing(structural=True):
+            text.insertTextContent(cursor, table, False)
         if data:
             for r, row in enumerate(data):
                 for c, value in enumerate(row):
@@ -236,40 +204,37 @@ def delete_table(table_index: int) -> bool:
     except UnoException:
         return False
 # --- Lists & Headings ---
-def insert_bullet_list(items, position = None) -> bool:
+def insert_bullet_list(items: List[str], position: Optional[int] = None) -> bool:
     try:
         doc = get_document()
-        cursor = doc.Text.createTextCursor()
-        if position is not None:
-            cursor.goRight(position, False)
-        for item in items:
-            doc.Text.insertString(cursor, f"• {item}\n", False)
+        cursor = _cursor_at(doc, position) if position is not None else doc.Text.createTextCursor()
+        with get_cache(doc).editing(structural=True):
+            for item in items:
+                doc.Text.insertString(cursor, f"• {item}\n", False)
         return True
     except UnoException:
         return False
 
-def insert_numbered_list(items, position = None) -> bool:
+def insert_numbered_list(items: List[str], position: Optional[int] = None) -> bool:
     try:
         doc = get_document()
-        cursor = doc.Text.createTextCursor()
-        if position is not None:
-            cursor.goRight(position, False)
-        for i, item in enumerate(items, 1):
-            doc.Text.insertString(cursor, f"{i}. {item}\n", False)
+        cursor = _cursor_at(doc, position) if position is not None else doc.Text.createTextCursor()
+        with get_cache(doc).editing(structural=True):
+            for i, item in enumerate(items, 1):
+                doc.Text.insertString(cursor, f"{i}. {item}\n", False)
         return True
     except UnoException:
         return False
 
-def insert_heading(text: str, level: int = 1, position = None) -> bool:
+def insert_heading(text: str, level: int = 1, position: Optional[int] = None) -> bool:
     try:
         doc = get_document()
-        cursor = doc.Text.createTextCursor()
-        if position is not None:
-            cursor.goRight(position, False)
-        doc.Text.insertString(cursor, text + "\n", False)
-        cursor.gotoStartOfParagraph(False)
-        cursor.gotoEndOfParagraph(True)
-        cursor.ParaStyleName = f"Heading {level}"
+        cursor = _cursor_at(doc, position) if position is not None else doc.Text.createTextCursor()
+        with get_cache(doc).editing(structural=True):
+            doc.Text.insertString(cursor, text + "\n", False)
+            cursor.gotoStartOfParagraph(False)
+            cursor.gotoEndOfParagraph(True)
+            cursor.ParaStyleName = f"Heading {level}"
         return True
     except UnoException:
         return False
@@ -278,31 +243,83 @@ Document Editing Toolset: Python functions to manipulate Writer documents via UN
 """
 
 # --- UNO API imports ---
+from contextlib import ExitStack, contextmanager
+
 import uno
 from com.sun.star.uno import Exception as UnoException
 from com.sun.star.beans import PropertyValue
 from com.sun.star.text.ControlCharacter import PARAGRAPH_BREAK
+from extension.tools.document_cache import get_cache
+from extension.tools.document_session import get_session
+
+# Document pinned by an enclosing batch_edit()
+_batch_document = None
 
 def get_document():
     """Get the current Writer document via UNO."""
-    ctx = uno.getComponentContext()
-    smgr = ctx.ServiceManager
-    desktop = smgr.createInstanceWithContext("com.sun.star.frame.Desktop", ctx)
-    model = desktop.getCurrentComponent()
+    if _batch_document is not None:
+        return _batch_document
+    model = get_session().get_model()
     if not model or not hasattr(model, 'Text'):  # Not a Writer doc
         raise RuntimeError("No Writer document is open.")
     return model
 
-def get_document_context() -> Dict:
-    """Extract basic context: word count, paragraph count, etc."""
+@contextmanager
+def batch_edit(undo_title: str = "LibreAI edits"):
+    """Resolve the document once and run every tool call in the block as a single edit.
+
+    Controllers are locked so the view repaints once at the end, and all changes
+    are grouped into one undo action titled ``undo_title``.
+    """
+    global _batch_document
+    if _batch_document is not None:
+        # Nested batches join the outer one
+        yield _batch_document
+        return
+    doc = get_document()
+    undo_manager = doc.getUndoManager()
+    # Each step is released, in reverse order, only once it has been taken, so a
+    # failure part way through never leaves the document locked or an undo context open
+    with ExitStack() as held:
+        doc.lockControllers()
+        held.callback(doc.unlockControllers)
+        doc.addActionLock()
+        held.callback(doc.removeActionLock)
+        undo_manager.enterUndoContext(undo_title)
+        held.callback(undo_manager.leaveUndoContext)
+        _batch_document = doc
+        try:
+            yield doc
+        finally:
+            _batch_document = None
+
+def _cursor_at(doc, position: int):
+    """Text cursor at a character position, walking only within the target paragraph."""
+    return get_cache(doc).paragraph_index().cursor_at(doc, position)
+
+def _range_cursor(doc, start: int, end: int):
+    """Text cursor selecting the characters between two positions."""
+    return get_cache(doc).paragraph_index().cursor_for_range(doc, start, end)
+
+def _has_paragraph_break(text: str) -> bool:
+    return "\n" in text or "\r" in text
+
+def get_document_context(request: str = None, top_k: int = 5, chunk_chars: int = 1500) -> Dict:
+    """Extract basic context: word count, paragraph count, etc.
+    Given a request, also the top_k document chunks most relevant to it, as "excerpts" in document order.
+    """
+    doc = get_document()
+    snapshot = get_cache(doc).snapshot()
+    context = {"word_count": snapshot.word_count, "paragraph_count": snapshot.paragraph_count}
+    if request:
+        context["excerpts"] = get_relevant_chunks(request, top_k, chunk_chars)
+    return context
+
+def get_relevant_chunks(request: str, top_k: int = 5, chunk_chars: int = 1500) -> List[Dict]:
+    """Return the top_k chunks of the document that best match request (BM25), in document order."""
     doc = get_document()
-    text = doc.Text
-    paragraphs = text.createEnumeration()
-    para_count = 0
-    for _ in paragraphs:
-        para_count += 1
-    word_count = len(text.getString().split())
-    return {"word_count": word_count, "paragraph_count": para_count}
+    hits = get_cache(doc).document_index(chunk_chars).search(request, top_k)
+    return sorted((chunk for _, chunk in hits), key=lambda chunk: chunk["first"])
 
 def insert_text_at_cursor(text: str) -> bool:
     """Insert the given text at the current cursor position."""
@@ -318,9 +335,9 @@ def insert_text_at_position(text: str, position: int) -> bool:
     """Insert text at the specified character position."""
     try:
         doc = get_document()
-        cursor = doc.Text.createTextCursor()
-        cursor.goRight(position, False)
-        doc.Text.insertString(cursor, text, False)
+        cursor = _cursor_at(doc, position)
+        with get_cache(doc).editing(position, len(text), structural=_has_paragraph_break(text)):
+            doc.Text.insertString(cursor, text, False)
         return True
     except UnoException:
         return False
@@ -334,19 +351,20 @@ def replace_text(old: str, new: str, match_case: bool = False, whole_words: bool
     search.SearchWords = whole_words
     found = doc.findAll(search)
     count = found.getCount()
-    for i in range(count):
-        found_item = found.getByIndex(i)
-        found_item.setString(new)
+    # Matches can be anywhere, and new may hold paragraph breaks, so the caches start over
+    with get_cache(doc).editing(structural=True):
+        for i in range(count):
+            found_item = found.getByIndex(i)
+            found_item.setString(new)
     return count
 
 def delete_text_range(start: int, end: int) -> bool:
     """Delete text between the specified character positions."""
     try:
         doc = get_document()
-        cursor = doc.Text.createTextCursor()
-        cursor.goRight(start, False)
-        cursor.goRight(end - start, True)
-        cursor.setString("")
+        cursor = _range_cursor(doc, start, end)
+        with get_cache(doc).editing(start, start - end):
+            cursor.setString("")
         return True
     except UnoException:
         return False
@@ -355,10 +373,9 @@ def delete_text_range(start: int, end: int) -> bool:
 def apply_character_style(style_name: str, start: int, end: int) -> bool:
     try:
         doc = get_document()
-        cursor = doc.Text.createTextCursor()
-        cursor.goRight(start, False)
-        cursor.goRight(end - start, True)
-        cursor.CharStyleName = style_name
+        cursor = _range_cursor(doc, start, end)
+        with get_cache(doc).editing():
+            cursor.CharStyleName = style_name
         return True
     except UnoException:
         return False
@@ -366,25 +383,22 @@ def apply_character_style(style_name: str, start: int, end: int) -> bool:
 def apply_paragraph_style(style_name: str, paragraph_index: int) -> bool:
     try:
         doc = get_document()
-        enum = doc.Text.createEnumeration()
-        idx = 0
-        while enum.hasMoreElements():
-            para = enum.nextElement()
-            if idx == paragraph_index:
-                para.ParaStyleName = style_name
-                return True
-            idx += 1
-        return False
+        cache = get_cache(doc)
+        para = cache.paragraph_index().element(paragraph_index)
+        if para is None:
+            return False
+        with cache.editing(paragraph=paragraph_index):
+            para.ParaStyleName = style_name
+        return True
     except UnoException:
         return False
 
 def set_bold(start: int, end: int, bold: bool = True) -> bool:
     try:
         doc = get_document()
-        cursor = doc.Text.createTextCursor()
-        cursor.goRight(start, False)
-        cursor.goRight(end - start, True)
-        cursor.CharWeight = 150 if bold else 100
+        cursor = _range_cursor(doc, start, end)
+        with get_cache(doc).editing():
+            cursor.CharWeight = 150 if bold else 100
         return True
     except UnoException:
         return False
@@ -392,10 +406,9 @@ def set_bold(start: int, end: int, bold: bool = True) -> bool:
 def set_italic(start: int, end: int, italic: bool = True) -> bool:
     try:
         doc = get_document()
-        cursor = doc.Text.createTextCursor()
-        cursor.goRight(start, False)
-        cursor.goRight(end - start, True)
-        cursor.CharPosture = 2 if italic else 0
+        cursor = _range_cursor(doc, start, end)
+        with get_cache(doc).editing():
+            cursor.CharPosture = 2 if italic else 0
         return True
     except UnoException:
         return False
@@ -403,10 +416,9 @@ def set_italic(start: int, end: int, italic: bool = True) -> bool:
 def set_underline(start: int, end: int, underline: bool = True) -> bool:
     try:
         doc = get_document()
-        cursor = doc.Text.createTextCursor()
-        cursor.goRight(start, False)
-        cursor.goRight(end - start, True)
-        cursor.CharUnderline = 1 if underline else 0
+        cursor = _range_cursor(doc, start, end)
+        with get_cache(doc).editing():
+            cursor.CharUnderline = 1 if underline else 0
         return True
     except UnoException:
         return False
@@ -414,10 +426,9 @@ def set_underline(start: int, end: int, underline: bool = True) -> bool:
 def set_font_size(start: int, end: int, size: float) -> bool:
     try:
         doc = get_document()
-        cursor = doc.Text.createTextCursor()
-        cursor.goRight(start, False)
-        cursor.goRight(end - start, True)
-        cursor.CharHeight = size
+        cursor = _range_cursor(doc, start, end)
+        with get_cache(doc).editing():
+            cursor.CharHeight = size
         return True
     except UnoException:
         return False
@@ -425,10 +436,9 @@ def set_font_size(start: int, end: int, size: float) -> bool:
 def set_font_color(start: int, end: int, color: str) -> bool:
     try:
         doc = get_document()
-        cursor = doc.Text.createTextCursor()
-        cursor.goRight(start, False)
-        cursor.goRight(end - start, True)
-        cursor.CharColor = int(color.lstrip('#'), 16)
+        cursor = _range_cursor(doc, start, end)
+        with get_cache(doc).editing():
+            cursor.CharColor = int(color.lstrip('#'), 16)
         return True
     except UnoException:
         return False
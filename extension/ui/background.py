@@ -0,0 +1,62 @@
+"""
+Background execution for the sidebar: runs LLM and tool work off the UI thread
+and posts results back to LibreOffice's main thread.
+"""
+import queue
+import threading
+
+import unohelper
+from com.sun.star.awt import XCallback
+
+
+class _MainThreadCallback(unohelper.Base, XCallback):
+    def __init__(self, func):
+        self.func = func
+    def notify(self, data):
+        self.func()
+
+
+def post_to_main_thread(ctx, func):
+    """Run func() on the LibreOffice main thread via com.sun.star.awt.AsyncCallback."""
+    smgr = ctx.ServiceManager
+    async_callback = smgr.createInstanceWithContext("com.sun.star.awt.AsyncCallback", ctx)
+    async_callback.addCallback(_MainThreadCallback(func), None)
+
+
+class BackgroundWorker:
+    """Single worker thread that runs queued jobs one at a time.
+
+    Each job is called with a threading.Event that is set when the job is cancelled;
+    long-running jobs should check it and stop early. Completion callbacks run on
+    the main thread.
+    """
+
+    def __init__(self, ctx):
+        self.ctx = ctx
+        self._jobs = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, job, on_success=None, on_error=None):
+        """Queue job(cancel_event); returns the cancel_event, set it to cancel the job."""
+        cancel_event = threading.Event()
+        self._jobs.put((job, on_success, on_error, cancel_event))
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="libreai-worker", daemon=True)
+                self._thread.start()
+        return cancel_event
+
+    def _run(self):
+        while True:
+            job, on_success, on_error, cancel_event = self._jobs.get()
+            try:
+                result = job(cancel_event)
+            except Exception as e:
+                if on_error:
+                    post_to_main_thread(self.ctx, lambda e=e: on_error(e))
+            else:
+                if on_success:
+                    post_to_main_thread(self.ctx, lambda result=result: on_success(result))
+            finally:
+                self._jobs.task_done()
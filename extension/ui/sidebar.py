@@ -23,9 +23,12 @@ class SidebarActionListener(unohelper.Base, XActionListener):
         self.callback(action_event)
 
 
-from extension.main import LibreAIMain
+import threading
+
+from extension.main import LibreAIMain, RequestCancelled
+from extension.ui.background import BackgroundWorker, post_to_main_thread
 from extension.ui.config_dialog import ConfigDialog
-from extension.conversation_manager import ConversationManager
+from extension.conversation_manager import ConversationRenderer
 
 def create_sidebar():
     ctx = uno.getComponentContext()
@@ -80,57 +83,155 @@ def create_sidebar():
     config_button.setLabel("Config")
     sidebar.addChild(config_button)
 
-    libreai = LibreAIMain()
+    cancel_button = toolkit.createButton()
+    cancel_button.setPosSize(10, 480, 110, 30, POS | SIZE)
+    cancel_button.setLabel("Cancel")
+    cancel_button.setEnable(False)
+    sidebar.addChild(cancel_button)
+
+    # The backend (config, provider, tokenizer) is built off the UI thread after the panel
+    # is shown, or by the first request if that comes sooner
+    backend = {"libreai": None, "lock": threading.Lock()}
+
+    def get_libreai():
+        with backend["lock"]:
+            if backend["libreai"] is None:
+                backend["libreai"] = LibreAIMain()
+            return backend["libreai"]
+    # Length of the text shown in conversation_area, so appends need not read it back
+    view_state = {"length": 0}
+    view_renderer = ConversationRenderer(
+        lambda m: f"[User] {m['content']}\n" if m["role"] == "user" else f"[AI] {m['content']}\n")
+
+    def replace_conversation_text(start, end, text):
+        conversation_area.insertText(uno.createUnoStruct("com.sun.star.awt.Selection", start, end), text)
+        view_state["length"] += len(text) - (end - start)
 
     def update_conversation():
-        text = ""
-        for m in libreai.conversation.get_history():
-            if m["role"] == "user":
-                text += f"[User] {m['content']}\n"
-            else:
-                text += f"[AI] {m['content']}\n"
-        conversation_area.setText(text)
+        # Drop streamed text not yet backed by a message, then apply only what changed
+        if view_state["length"] > view_renderer.length:
+            replace_conversation_text(view_renderer.length, view_state["length"], "")
+        if backend["libreai"] is None:
+            return
+        for start, end, text in view_renderer.sync(backend["libreai"].conversation):
+            replace_conversation_text(start, end, text)
+
+    def append_to_conversation(text):
+        end = view_state["length"]
+        replace_conversation_text(end, end, text)
+
+    worker = BackgroundWorker(ctx)
+    # Cancel event of the request in flight, if any
+    request_state = {"cancel_event": None}
+    # Streamed chunks waiting to be shown; flushed on the main thread in one append
+    stream_state = {"chunks": [], "scheduled": False, "lock": threading.Lock()}
+
+    def flush_stream():
+        with stream_state["lock"]:
+            text = "".join(stream_state["chunks"])
+            stream_state["chunks"] = []
+            stream_state["scheduled"] = False
+        if text:
+            append_to_conversation(text)
+
+    def on_token(chunk):
+        # Called on the worker thread
+        with stream_state["lock"]:
+            stream_state["chunks"].append(chunk)
+            if stream_state["scheduled"]:
+                return
+            stream_state["scheduled"] = True
+        post_to_main_thread(ctx, flush_stream)
+
+    def set_busy(busy):
+        progress_bar.setVisible(busy)
+        send_button.setEnable(not busy)
+        cancel_button.setEnable(busy)
+
+    def request_finished(result):
+        request_state["cancel_event"] = None
+        flush_stream()
+        update_conversation()
+        status_label.setText("")
+        set_busy(False)
+        if result.get("status") not in (None, "done"):
+            # The agent loop ran out of steps, time or tokens before the model finished
+            status_label.setText(f"Stopped after {result['steps']} steps ({result['status']}).")
+        tool_results = result.get("tool_result") or []
+        if isinstance(tool_results, dict):
+            tool_results = [tool_results]
+        errors = [r["error"] for r in tool_results if not r.get("success", True)]
+        if errors:
+            show_error_dialog(ctx, "Tool error: " + "; ".join(errors))
+
+    def request_failed(error):
+        request_state["cancel_event"] = None
+        flush_stream()
+        update_conversation()
+        set_busy(False)
+        if isinstance(error, RequestCancelled):
+            status_label.setText("Request cancelled.")
+            return
+        show_error_dialog(ctx, f"AI error: {str(error)}")
+        status_label.setText("Error occurred.")
 
     def send_clicked(_):
+        if request_state["cancel_event"] is not None:
+            return
         user_message = input_box.getText().strip()
         if not user_message:
             status_label.setText("Input is empty.")
             return
         status_label.setText("Thinking...")
-        progress_bar.setVisible(True)
-        try:
-            result = libreai.process_user_request(user_message)
-            update_conversation()
-            status_label.setText("")
-            input_box.setText("")
-            if result.get("tool_result") and not result["tool_result"].get("success", True):
-                show_error_dialog(ctx, f"Tool error: {result['tool_result']['error']}")
-        except Exception as e:
-            show_error_dialog(ctx, f"AI error: {str(e)}")
-            status_label.setText("Error occurred.")
-        finally:
-            progress_bar.setVisible(False)
+        set_busy(True)
+        input_box.setText("")
+        # Stream the reply into the conversation area as it arrives
+        append_to_conversation(f"[User] {user_message}\n[AI] ")
+        request_state["cancel_event"] = worker.submit(
+            lambda cancel_event: get_libreai().process_user_request(user_message, on_token=on_token, cancel_event=cancel_event),
+            on_success=request_finished,
+            on_error=request_failed,
+        )
+
+    def cancel_clicked(_):
+        cancel_event = request_state["cancel_event"]
+        if cancel_event is not None:
+            cancel_event.set()
+            status_label.setText("Cancelling...")
 
     def clear_clicked(_):
+        if request_state["cancel_event"] is not None:
+            status_label.setText("Wait for the current request to finish.")
+            return
         try:
-            libreai.conversation = ConversationManager(max_tokens=100000, summarizer=libreai._summarize)
+            if backend["libreai"] is not None:
+                backend["libreai"].reset_conversation()
             update_conversation()
             status_label.setText("Conversation cleared.")
         except Exception as e:
             show_error_dialog(ctx, f"Error clearing conversation: {str(e)}")
 
     def config_clicked(_):
+        if request_state["cancel_event"] is not None:
+            status_label.setText("Wait for the current request to finish.")
+            return
         try:
             ConfigDialog(ctx).show_dialog()
-            libreai.reload_provider()
+            # A backend not built yet will read the new config when it is
+            if backend["libreai"] is not None:
+                backend["libreai"].reload_provider()
         except Exception as e:
             show_error_dialog(ctx, f"Error opening config: {str(e)}")
 
     send_button.addActionListener(SidebarActionListener(send_clicked))
     clear_button.addActionListener(SidebarActionListener(clear_clicked))
     config_button.addActionListener(SidebarActionListener(config_clicked))
+    cancel_button.addActionListener(SidebarActionListener(cancel_clicked))
 
     update_conversation()
+    # Warm the backend up in the background; a failure here is retried by the first request
+    worker.submit(lambda cancel_event: get_libreai(),
+                  on_error=lambda e: status_label.setText(f"AI backend not ready: {e}"))
 
 
 def update_conversation():
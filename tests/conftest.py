@@ -0,0 +1,164 @@
+"""
+Stand-ins for the UNO bindings so the unit tests run without a LibreOffice install.
+
+The Fake* classes below model just enough of a Writer document (body text made of
+paragraphs and tables, view cursor, modify listener) for the cache and index tests,
+which import them from here.
+
+When pyuno is importable the real modules are used. Otherwise ``uno``, ``unohelper``
+and every ``com.sun.star`` module are stubbed: interface names (XModifyListener, ...)
+become empty base classes, upper-case constants become 0, and any other name (such
+as ``com.sun.star.uno.Exception``) becomes an exception class.
+"""
+import importlib.abc
+import importlib.machinery
+import importlib.util
+import sys
+import types
+
+
+class _StubModule(types.ModuleType):
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        if name.startswith("X") and name[1:2].isupper():
+            value = type(name, (), {})
+        elif name.isupper():
+            value = 0
+        else:
+            value = type(name, (Exception,), {})
+        setattr(self, name, value)
+        return value
+
+
+class _StubFinder(importlib.abc.MetaPathFinder, importlib.abc.Loader):
+    def find_spec(self, fullname, path, target=None):
+        if fullname in ("uno", "unohelper", "com") or fullname.startswith("com."):
+            return importlib.machinery.ModuleSpec(fullname, self, is_package=True)
+        return None
+
+    def create_module(self, spec):
+        return _StubModule(spec.name)
+
+    def exec_module(self, module):
+        module.__path__ = []
+        if module.__name__ == "uno":
+            def getComponentContext():
+                raise RuntimeError("no office running")
+            module.getComponentContext = getComponentContext
+            module.systemPathToFileUrl = lambda path: "file://" + path
+        elif module.__name__ == "unohelper":
+            module.Base = type("Base", (), {})
+
+
+collect_ignore = []
+
+if importlib.util.find_spec("uno") is None:
+    sys.meta_path.append(_StubFinder())
+    # Talks to a running office, which the stubs cannot stand in for
+    collect_ignore.append("test_document_tools.py")
+
+
+class FakeRange:
+    def __init__(self, element, offset=0):
+        self.element = element
+        self.offset = offset
+    def getStart(self):
+        return self
+
+
+class FakeParagraph:
+    def __init__(self, text, style="Standard"):
+        self.text = text
+        self.ParaStyleName = style
+        self.reads = 0
+    def supportsService(self, name):
+        return name == "com.sun.star.text.Paragraph"
+    def getString(self):
+        self.reads += 1
+        return self.text
+    def getStart(self):
+        return FakeRange(self)
+
+
+class FakeTable:
+    def supportsService(self, name):
+        return name == "com.sun.star.text.TextTable"
+
+
+class FakeEnumeration:
+    def __init__(self, elements):
+        self.elements = list(elements)
+    def hasMoreElements(self):
+        return bool(self.elements)
+    def nextElement(self):
+        return self.elements.pop(0)
+
+
+class FakeCursor:
+    def __init__(self, text, position):
+        self.text = text
+        self.position = position
+    def gotoNextParagraph(self, expand):
+        following = self.text.elements[self.text.elements.index(self.position.element) + 1:]
+        paragraphs = [e for e in following if isinstance(e, FakeParagraph)]
+        if not paragraphs:
+            return False
+        self.position = FakeRange(paragraphs[0])
+        return True
+    def getStart(self):
+        return self.position
+
+
+class FakeText:
+    def __init__(self, elements):
+        self.elements = elements
+    def createEnumeration(self):
+        return FakeEnumeration(self.elements)
+    def createTextCursorByRange(self, position):
+        return FakeCursor(self, position)
+    def _key(self, position):
+        if not isinstance(position.element, FakeParagraph) or position.element not in self.elements:
+            raise RuntimeError("IllegalArgumentException")
+        return self.elements.index(position.element), position.offset
+    def compareRegionStarts(self, a, b):
+        a, b = self._key(a), self._key(b)
+        return 1 if a < b else 0 if a == b else -1
+
+
+class FakeNames:
+    def __init__(self, names):
+        self.names = list(names)
+    def getElementNames(self):
+        return tuple(self.names)
+    def getCount(self):
+        return len(self.names)
+
+
+class FakeController:
+    def __init__(self):
+        self.view_cursor = None
+    def getViewCursor(self):
+        return self.view_cursor
+
+
+class FakeDocument:
+    def __init__(self, elements, images=()):
+        self.Text = FakeText(elements)
+        self.CurrentController = FakeController()
+        self.images = images
+        self.listener = None
+    def getTextTables(self):
+        tables = [e for e in self.Text.elements if isinstance(e, FakeTable)]
+        return FakeNames(f"Table{n}" for n in range(1, len(tables) + 1))
+    def getGraphicObjects(self):
+        return FakeNames(self.images)
+    def addModifyListener(self, listener):
+        self.listener = listener
+    def removeModifyListener(self, listener):
+        self.listener = None
+    def type_in(self, paragraph, text):
+        """Simulate the user editing a paragraph: the view cursor is in it when the listener fires."""
+        paragraph.text = text
+        self.CurrentController.view_cursor = FakeRange(paragraph, len(text))
+        self.listener.modified(None)
@@ -0,0 +1,100 @@
+import threading
+import unittest
+from extension.orchestrator import AgentLoop, AgentMetrics, agent_loop_settings, loop_budgets, metrics
+
+
+def call(tool, **args):
+    return {"tool": tool, "args": args}
+
+
+class ScriptedModel:
+    """Returns the scripted replies in order and records the prompts it was given."""
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.prompts = []
+    def __call__(self, prompt):
+        self.prompts.append(prompt)
+        if self.replies:
+            return self.replies.pop(0)
+        return {"content": "", "tool_calls": [call("count_words")]}
+
+
+def dispatch(calls):
+    return [{"success": True, "result": f"{c['tool']} ok"} for c in calls]
+
+
+class TestAgentLoop(unittest.TestCase):
+    def setUp(self):
+        metrics.reset()
+
+    def test_feeds_results_back_until_done(self):
+        model = ScriptedModel(
+            {"content": "", "tool_calls": [call("find_text", query="Intro")]},
+            {"content": "", "tool_calls": [call("set_bold", start=0, end=5), call("set_italic", start=0, end=5)]},
+            {"content": "Done.", "tool_calls": []},
+        )
+        outcome = AgentLoop(model, dispatch).run("User: emphasise Intro\nAI:")
+        self.assertEqual(outcome["status"], "done")
+        self.assertEqual(outcome["content"], "Done.")
+        self.assertEqual(outcome["steps"], 3)
+        self.assertEqual([c["tool"] for c in outcome["tool_calls"]], ["find_text", "set_bold", "set_italic"])
+        self.assertIn("find_text ok", model.prompts[1])
+        self.assertTrue(model.prompts[2].startswith(model.prompts[1]))
+        self.assertTrue(model.prompts[2].endswith("AI:"))
+        self.assertGreater(outcome["tokens"], 0)
+
+    def test_budgets_stop_runaway_loops(self):
+        self.assertEqual(AgentLoop(ScriptedModel(), dispatch, max_steps=3).run("AI:")["status"], "max_steps")
+        self.assertEqual(AgentLoop(ScriptedModel(), dispatch, deadline=0).run("AI:")["status"], "deadline")
+        outcome = AgentLoop(ScriptedModel(), dispatch, token_budget=50).run("AI:")
+        self.assertEqual(outcome["status"], "token_budget")
+        self.assertGreaterEqual(outcome["tokens"], 50)
+
+    def test_known_context_is_not_charged(self):
+        class CountingCounter:
+            def __init__(self):
+                self.counted = []
+            def count(self, text):
+                self.counted.append(text)
+                return len(text) // 4
+        counter = CountingCounter()
+        history = "User: hello\nAI: hi\n" * 5000 + "User: emphasise Intro\nAI:"
+        model = ScriptedModel({"content": "", "tool_calls": [call("find_text", query="Intro")]},
+                              {"content": "Done.", "tool_calls": []})
+        outcome = AgentLoop(model, dispatch, token_budget=1000, token_counter=counter).run(history, prompt_tokens=0)
+        # A conversation far past the budget still gets every step, and is never tokenized again
+        self.assertEqual((outcome["status"], outcome["steps"]), ("done", 2))
+        self.assertIn("find_text ok", model.prompts[1])
+        self.assertNotIn(history, counter.counted)
+        self.assertLess(outcome["tokens"], 1000)
+
+    def test_cancel(self):
+        cancel = threading.Event()
+        def cancelling_dispatch(calls):
+            cancel.set()
+            return dispatch(calls)
+        outcome = AgentLoop(ScriptedModel(), cancelling_dispatch).run("AI:", cancel_event=cancel)
+        self.assertEqual((outcome["status"], outcome["steps"]), ("cancelled", 1))
+
+    def test_metrics(self):
+        AgentLoop(ScriptedModel({"content": "Hi", "tool_calls": []}), dispatch).run("AI:")
+        AgentLoop(ScriptedModel(), dispatch, max_steps=3).run("AI:")
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot["tasks"], 2)
+        self.assertEqual(snapshot["steps_per_task"], 2.0)
+        self.assertEqual(snapshot["max_steps_per_task"], 3)
+        self.assertEqual(snapshot["stop_reasons"], {"done": 1, "max_steps": 1})
+        self.assertEqual(AgentMetrics().steps_per_task, 0.0)
+
+    def test_settings(self):
+        settings = agent_loop_settings({"agent_loop": {"max_steps": 2}})
+        self.assertEqual(settings["max_steps"], 2)
+        self.assertIn("token_budget", settings)
+        # Keys AgentLoop does not take are dropped rather than failing its constructor
+        self.assertNotIn("max_retries", agent_loop_settings({"agent_loop": {"max_retries": 3}}))
+        self.assertEqual(loop_budgets({"max_steps": 2, "max_retries": 3}), {"max_steps": 2})
+        AgentLoop(ScriptedModel(), dispatch, **loop_budgets({"deadline": 1.0, "max_retries": 3}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,25 @@
+import subprocess
+import sys
+import unittest
+from extension import agentic_tools
+
+
+class TestToolRegistry(unittest.TestCase):
+    def test_registry_lists_tools_without_building_them(self):
+        self.assertEqual(len(agentic_tools.TOOL_REGISTRY), len(agentic_tools.TOOL_FUNCTIONS))
+        self.assertIn("set_bold", agentic_tools.TOOL_REGISTRY)
+        self.assertNotIn("no_such_tool", agentic_tools.TOOL_REGISTRY)
+        self.assertEqual(agentic_tools.TOOL_REGISTRY._tools, {})
+
+    def test_backend_import_is_lightweight(self):
+        code = (
+            "import sys, extension.main\n"
+            "heavy = [m for m in ('langchain', 'uno', 'extension.tools.document_tools') if m in sys.modules]\n"
+            "print(','.join(heavy))\n"
+        )
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), "")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import unittest
+from unittest import mock
+
+from extension import agentic_tools
+from extension.tools import document_tools
+
+
+class FakeUndoManager:
+    def __init__(self, log, fail=False):
+        self.log = log
+        self.fail = fail
+    def enterUndoContext(self, title):
+        if self.fail:
+            raise RuntimeError("undo manager busy")
+        self.log.append("enterUndoContext")
+    def leaveUndoContext(self):
+        self.log.append("leaveUndoContext")
+
+
+class FakeDoc:
+    """Records the lock and undo calls batch_edit makes; fail_on names a call that raises."""
+    Text = None
+
+    def __init__(self, fail_on=None):
+        self.log = []
+        self.fail_on = fail_on
+        self.undo_manager = FakeUndoManager(self.log, fail_on == "enterUndoContext")
+    def _call(self, name):
+        if name == self.fail_on:
+            raise RuntimeError(name + " failed")
+        self.log.append(name)
+    def getUndoManager(self):
+        return self.undo_manager
+    def lockControllers(self):
+        self._call("lockControllers")
+    def unlockControllers(self):
+        self._call("unlockControllers")
+    def addActionLock(self):
+        self._call("addActionLock")
+    def removeActionLock(self):
+        self._call("removeActionLock")
+
+
+FULL_PAIRING = ["lockControllers", "addActionLock", "enterUndoContext",
+                "leaveUndoContext", "removeActionLock", "unlockControllers"]
+
+
+class TestBatchEdit(unittest.TestCase):
+    def run_batch(self, doc, body=None):
+        with mock.patch.object(document_tools, "get_session") as get_session:
+            get_session.return_value.get_model.return_value = doc
+            with document_tools.batch_edit("Test edits") as pinned:
+                self.assertIs(document_tools.get_document(), doc)
+                if body:
+                    body(pinned)
+
+    def test_success_releases_in_reverse_order(self):
+        doc = FakeDoc()
+        self.run_batch(doc)
+        self.assertEqual(doc.log, FULL_PAIRING)
+        self.assertIsNone(document_tools._batch_document)
+
+    def test_exception_in_block_releases_everything(self):
+        doc = FakeDoc()
+        def fail(_):
+            raise ValueError("tool failed")
+        with self.assertRaises(ValueError):
+            self.run_batch(doc, fail)
+        self.assertEqual(doc.log, FULL_PAIRING)
+        self.assertIsNone(document_tools._batch_document)
+
+    def test_failure_while_acquiring_releases_only_what_was_taken(self):
+        doc = FakeDoc(fail_on="addActionLock")
+        with self.assertRaises(RuntimeError):
+            self.run_batch(doc)
+        self.assertEqual(doc.log, ["lockControllers", "unlockControllers"])
+        self.assertIsNone(document_tools._batch_document)
+
+        doc = FakeDoc(fail_on="enterUndoContext")
+        with self.assertRaises(RuntimeError):
+            self.run_batch(doc)
+        self.assertEqual(doc.log, ["lockControllers", "addActionLock", "removeActionLock", "unlockControllers"])
+        self.assertIsNone(document_tools._batch_document)
+
+    def test_nested_batch_joins_outer(self):
+        doc = FakeDoc()
+        def nested(pinned):
+            with document_tools.batch_edit("Inner") as inner:
+                self.assertIs(inner, pinned)
+        self.run_batch(doc, nested)
+        self.assertEqual(doc.log, FULL_PAIRING)
+
+    def test_call_tools_pairs_locks_when_a_tool_fails(self):
+        doc = FakeDoc()
+        def broken_tool(**args):
+            raise RuntimeError("no such paragraph")
+        with mock.patch.object(document_tools, "get_session") as get_session, \
+                mock.patch.object(agentic_tools, "call_tool", side_effect=broken_tool):
+            get_session.return_value.get_model.return_value = doc
+            results = agentic_tools.call_tools([{"tool": "set_bold", "args": {}}])
+        self.assertFalse(results[0]["success"])
+        self.assertEqual(doc.log, FULL_PAIRING)
+        self.assertIsNone(document_tools._batch_document)
+
+    def test_call_tools_reports_a_missing_document_per_call(self):
+        with mock.patch.object(document_tools, "get_session") as get_session:
+            get_session.return_value.get_model.return_value = None
+            results = agentic_tools.call_tools([{"tool": "set_bold", "args": {}}, {"tool": "set_italic", "args": {}}])
+        self.assertEqual(results, [{"success": False, "error": "No Writer document is open."}] * 2)
+        self.assertIsNone(document_tools._batch_document)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,174 @@
+import unittest
+from extension.conversation_manager import ConversationManager, ConversationRenderer
+
+
+class TestConversationManager(unittest.TestCase):
+    def make_manager(self, max_tokens, summarizer=None):
+        manager = ConversationManager(max_tokens=max_tokens, summarizer=summarizer)
+        # Deterministic counts regardless of whether tiktoken is installed
+        manager.token_counter.encoding = None
+        return manager
+
+    def test_running_total_matches_history(self):
+        manager = self.make_manager(1000)
+        manager.add_message("user", "a" * 40)
+        manager.add_message("ai", "b" * 80)
+        self.assertEqual(manager._total_tokens(), 30)
+
+    def test_eviction_updates_total(self):
+        manager = self.make_manager(25)
+        for _ in range(5):
+            manager.add_message("user", "x" * 40)
+        self.assertEqual(len(manager.get_history()), 2)
+        self.assertEqual(manager._total_tokens(), 20)
+
+    def test_pinned_messages_survive_eviction(self):
+        manager = self.make_manager(25)
+        manager.add_message("system", "p" * 20)
+        for _ in range(5):
+            manager.add_message("user", "x" * 40)
+        history = manager.get_history()
+        self.assertEqual(history[0], {"role": "system", "content": "p" * 20})
+        self.assertEqual(len(history), 3)
+        self.assertEqual(manager._total_tokens(), 25)
+
+    def test_summarizer_compacts_oldest_chunk(self):
+        manager = self.make_manager(15, summarizer=lambda history: "s" * 8)
+        manager.add_message("user", "x" * 40)
+        manager.add_message("ai", "y" * 40)
+        self.assertEqual(manager.get_history(), [{"role": "system", "content": "ssssssss"}, {"role": "ai", "content": "y" * 40}])
+        self.assertEqual(manager._total_tokens(), 12)
+
+    def test_summaries_are_tiered_and_bounded(self):
+        calls = []
+        def summarizer(history):
+            calls.append([m["content"] for m in history])
+            return f"summary {len(calls)}"
+        manager = self.make_manager(20, summarizer=summarizer)
+        manager.summary_fanout = 2
+        manager.summary_levels = 2
+        for i in range(40):
+            manager.add_message("user", f"{i:02d}" + "x" * 38)
+        self.assertLessEqual(len(manager.summary_tiers), 2)
+        self.assertTrue(all(len(level) <= 2 for level in manager.summary_tiers))
+        # Turns are summarized once; later calls only ever see summaries
+        turn_calls = [c for c in calls if not c[0].startswith("summary")]
+        summarized = [content for c in turn_calls for content in c]
+        self.assertEqual(len(summarized), len(set(summarized)))
+        self.assertEqual(manager._total_tokens(), sum(manager._count_tokens(m["content"]) for m in manager.get_history()))
+
+    def test_background_summarization(self):
+        calls = []
+        def summarizer(history):
+            calls.append(len(history))
+            return "summary"
+        manager = ConversationManager(max_tokens=40, summarizer=summarizer, background_summarization=True)
+        manager.token_counter.encoding = None
+        for _ in range(4):
+            manager.add_message("user", "x" * 40)
+        # Crossing the soft limit starts a compaction without blocking add_message
+        job = manager._compaction
+        self.assertIsNotNone(job)
+        job["thread"].join()
+        self.assertEqual(len(manager.get_history()), 4)
+        manager.add_message("ai", "y" * 4)
+        history = manager.get_history()
+        self.assertEqual(history[0], {"role": "system", "content": "summary"})
+        self.assertEqual(calls, [job["count"]])
+        self.assertEqual(manager._total_tokens(), sum(manager._count_tokens(m["content"]) for m in history))
+
+    def test_background_summaries_survive_eviction(self):
+        # Each turn pushes past both the soft limit and max_tokens, so turns are evicted on the
+        # same add that starts a compaction and while it runs; the summaries must still land
+        manager = ConversationManager(max_tokens=40, summarizer=lambda history: "summary",
+                                      background_summarization=True)
+        manager.token_counter.encoding = None
+        for i in range(12):
+            manager.add_message("user" if i % 2 == 0 else "ai", "x" * 60)
+            if manager._compaction is not None:
+                manager._compaction["thread"].join()
+        self.assertTrue(manager.summary_tiers)
+        self.assertTrue(manager.summary_tiers[0])
+        history = manager.get_history()
+        self.assertEqual(history[0], {"role": "system", "content": "summary"})
+        self.assertEqual(manager._total_tokens(), sum(manager._count_tokens(m["content"]) for m in history))
+
+    def test_background_summaries_fill_the_tiers(self):
+        manager = ConversationManager(max_tokens=40, summarizer=lambda history: "summary",
+                                      background_summarization=True, summary_fanout=2, summary_levels=3)
+        manager.token_counter.encoding = None
+        for _ in range(40):
+            manager.add_message("user", "x" * 60)
+            if manager._compaction is not None:
+                manager._compaction["thread"].join()
+        self.assertEqual(len(manager.summary_tiers), 3)
+        self.assertTrue(all(len(level) <= 2 for level in manager.summary_tiers))
+
+    def test_estimates_are_refined_near_the_limit(self):
+        class HalfEncoding:
+            # Two characters per token
+            def encode(self, text):
+                return range(len(text) // 2)
+        manager = ConversationManager(max_tokens=100, estimate_tokens=True)
+        manager.token_counter.encoding = HalfEncoding()
+        manager.add_message("user", "x" * 40)
+        # Far from the limit: the uncalibrated estimate (4 chars per token) is kept
+        self.assertEqual(manager._total_tokens(), 10)
+        for _ in range(8):
+            manager.add_message("user", "x" * 40)
+        # Near the limit every estimated turn was recounted exactly, once
+        self.assertEqual(manager._estimated, 0)
+        self.assertEqual(manager._total_tokens(), sum(manager._token_counts))
+        self.assertTrue(all(count == 20 for count in manager._token_counts))
+        self.assertLessEqual(manager._total_tokens(), 100)
+        self.assertEqual(manager.token_counter.chars_per_token, 2.0)
+
+
+class TestConversationRenderer(unittest.TestCase):
+    @staticmethod
+    def render(m):
+        return f"{m['role']}: {m['content']}\n"
+
+    def apply(self, text, edits):
+        for start, end, new in edits:
+            text = text[:start] + new + text[end:]
+        return text
+
+    def expected(self, manager):
+        return "".join(self.render(m) for m in manager.get_history())
+
+    def test_incremental_edits_match_full_render(self):
+        manager = ConversationManager(max_tokens=40)
+        manager.token_counter.encoding = None
+        renderer = ConversationRenderer(self.render)
+        text = ""
+        for i in range(30):
+            manager.add_message("user" if i % 2 else "ai", f"message {i} " + "z" * (i % 7) * 4)
+            if i == 10:
+                manager.add_message("system", "be brief")
+            if i % 3 == 0:
+                edits = renderer.sync(manager)
+                text = self.apply(text, edits)
+                self.assertEqual(text, self.expected(manager))
+                self.assertEqual(renderer.length, len(text))
+
+    def test_append_only_renders_new_messages(self):
+        manager = ConversationManager()
+        renderer = ConversationRenderer(self.render)
+        manager.add_message("user", "hi")
+        renderer.sync(manager)
+        manager.add_message("ai", "hello")
+        self.assertEqual(renderer.sync(manager), [(9, 9, "ai: hello\n")])
+
+    def test_summarization_rebuilds(self):
+        manager = ConversationManager(max_tokens=5, summarizer=lambda history: "short")
+        manager.token_counter.encoding = None
+        renderer = ConversationRenderer(self.render)
+        manager.add_message("user", "x")
+        renderer.sync(manager)
+        manager.add_message("user", "y" * 40)
+        self.assertEqual(renderer.sync(manager), [(0, 8, "system: short\nuser: " + "y" * 40 + "\n")])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+from conftest import FakeDocument, FakeParagraph, FakeTable
+from extension.tools.document_cache import DocumentSnapshot, ParagraphIndex
+
+
+class TestParagraphIndex(unittest.TestCase):
+    def setUp(self):
+        doc = FakeDocument([FakeParagraph("Hello"), FakeTable(), FakeParagraph(""), FakeParagraph("World!")])
+        self.index = ParagraphIndex.build(doc)
+
+    def test_build_skips_tables(self):
+        self.assertEqual(self.index.starts, [0, 6, 7])
+        self.assertEqual(self.index.lengths, [5, 0, 6])
+
+    def test_element_counts_tables(self):
+        self.assertEqual(self.index.element(0).getString(), "Hello")
+        self.assertTrue(self.index.element(1).supportsService("com.sun.star.text.TextTable"))
+        self.assertEqual(self.index.element(3).getString(), "World!")
+        self.assertIsNone(self.index.element(4))
+        self.assertIsNone(self.index.element(-1))
+
+    def test_locate(self):
+        self.assertEqual(self.index.locate(0), (0, 0))
+        self.assertEqual(self.index.locate(5), (0, 5))
+        self.assertEqual(self.index.locate(6), (1, 0))
+        self.assertEqual(self.index.locate(9), (2, 2))
+
+    def test_shift_within_paragraph(self):
+        self.assertTrue(self.index.shift(2, 3))
+        self.assertEqual(self.index.starts, [0, 9, 10])
+        self.assertTrue(self.index.shift(11, -2))
+        self.assertEqual(self.index.starts, [0, 9, 10])
+        self.assertEqual(self.index.lengths, [8, 0, 4])
+
+    def test_shift_across_paragraphs_is_rejected(self):
+        self.assertFalse(self.index.shift(3, -4))
+
+
+class TestDocumentSnapshot(unittest.TestCase):
+    def test_build(self):
+        doc = FakeDocument(
+            [FakeParagraph("Title", "Heading 1"), FakeParagraph("Some body text here"), FakeTable(), FakeParagraph("More words")],
+            images=["Image1", "Image2"])
+        snapshot = DocumentSnapshot.build(doc)
+        self.assertEqual(snapshot.word_count, 7)
+        self.assertEqual(snapshot.paragraph_count, 4)
+        self.assertEqual(snapshot.headings, [{"index": 0, "text": "Title", "style": "Heading 1"}])
+        self.assertEqual(snapshot.tables, ["Table1"])
+        self.assertEqual(snapshot.images, ["Image1", "Image2"])
+        self.assertEqual(snapshot.paragraph_index.starts, [0, 6, 26])
+
+
+if __name__ == '__main__':
+    unittest.main()
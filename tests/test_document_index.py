@@ -0,0 +1,142 @@
+import unittest
+from conftest import FakeDocument, FakeParagraph, FakeRange, FakeTable
+from extension.tools.document_index import DocumentIndex
+
+
+def make_document():
+    sections = []
+    for n in range(20):
+        sections.append(FakeParagraph(f"Section {n}", "Heading 1"))
+        sections.append(FakeParagraph(f"Body text of section {n} about topic{n}."))
+    sections.insert(10, FakeTable())
+    return FakeDocument(sections)
+
+
+def interrupt(paragraph, action):
+    """Run action, e.g. the user typing on the UI thread, the next time paragraph is read."""
+    read = paragraph.getString
+    def getString():
+        paragraph.getString = read
+        action()
+        return read()
+    paragraph.getString = getString
+
+
+class TestDocumentIndex(unittest.TestCase):
+    def setUp(self):
+        self.doc = make_document()
+        self.index = DocumentIndex(self.doc)
+        self.index.search("topic3")
+
+    def paragraph(self, n):
+        return [e for e in self.doc.Text.elements if isinstance(e, FakeParagraph)][n]
+
+    def test_typing_reindexes_only_the_edited_paragraph(self):
+        edited = self.paragraph(25)
+        reads_before = {id(p): p.reads for p in self.doc.Text.elements if isinstance(p, FakeParagraph)}
+        self.doc.type_in(edited, "Body text now mentions penguins.")
+        hits = self.index.search("penguins")
+        self.assertEqual(self.index.stats, {"rebuilds": 1, "reindexed": 1})
+        self.assertIn("penguins", hits[0][1]["text"])
+        self.assertEqual(hits[0][1]["first"], self.doc.Text.elements.index(edited) - 1)
+        untouched = [p for p in self.doc.Text.elements if isinstance(p, FakeParagraph) and p.reads == reads_before[id(p)]]
+        # Paragraphs after the chunk being returned were not read again
+        self.assertEqual(untouched, [self.paragraph(n) for n in range(26, 40)])
+
+    def test_offsets_follow_edits(self):
+        start = self.index.search("topic3")[0][1]["start"]
+        self.doc.type_in(self.paragraph(1), "Body text of section 0 about topic0, now longer.")
+        self.assertEqual(self.index.search("topic3")[0][1]["start"], start + len(", now longer"))
+        self.assertEqual(self.index.stats["rebuilds"], 1)
+
+    def test_text_offsets_survive_blank_paragraphs(self):
+        elements = self.doc.Text.elements
+        heading = self.paragraph(14)
+        elements.insert(elements.index(heading) + 1, FakeParagraph(""))
+        self.index.mark_stale()
+        self.index.search("topic7")
+        self.doc.type_in(self.paragraph(16), "Body text of section 7 about topic7 and zebras.")
+        chunk = self.index.search("zebras")[0][1]
+        self.assertEqual(chunk["text"], "Section 7\n\nBody text of section 7 about topic7 and zebras.")
+        # Offsets follow ParagraphIndex: one character per paragraph break, none for tables
+        document = "\n".join(e.text for e in elements if isinstance(e, FakeParagraph))
+        self.assertEqual(chunk["start"] + chunk["text"].index("zebras"), document.index("zebras"))
+        self.assertEqual(self.index.stats["rebuilds"], 2)
+
+    def test_mark_offset_reads_dirty_paragraphs_first(self):
+        self.doc.type_in(self.paragraph(1), "Body text of section 0 about topic0, " + "much longer " * 20)
+        # A tool edit in paragraph 9, at an offset counted in the document as it is now
+        target = self.paragraph(9)
+        paragraphs = [e for e in self.doc.Text.elements if isinstance(e, FakeParagraph)]
+        offset = sum(len(p.text) + 1 for p in paragraphs[:9]) + 3
+        target.text = "Body text of section 4 about topic4 and walruses."
+        self.index.mark_offset(offset)
+        self.assertIn(self.doc.Text.elements.index(target), self.index.dirty)
+        self.assertIn("walruses", self.index.search("walruses")[0][1]["text"])
+        self.assertEqual(self.index.stats["rebuilds"], 1)
+
+    def test_paragraph_split_rebuilds(self):
+        elements = self.doc.Text.elements
+        edited = self.paragraph(5)
+        edited.text = "Body text"
+        elements.insert(elements.index(edited) + 1, FakeParagraph("of section 2 about split."))
+        self.doc.type_in(edited, edited.text)
+        self.assertIn("split", self.index.search("split")[0][1]["text"])
+        self.assertEqual(self.index.stats["rebuilds"], 2)
+
+    def test_edits_outside_body_text_rebuild(self):
+        self.doc.CurrentController.view_cursor = FakeRange(FakeTable())
+        self.doc.listener.modified(None)
+        self.index.search("topic3")
+        self.assertEqual(self.index.stats["rebuilds"], 2)
+
+    def test_unlocated_edit_caught_before_sending(self):
+        # Changed without the view cursor being there, e.g. by replace all
+        self.paragraph(7).text = "Body text of section 3 about topic3 and more."
+        self.doc.type_in(self.paragraph(30), self.paragraph(30).text)
+        hits = self.index.search("topic3")
+        self.assertIn("and more", hits[0][1]["text"])
+        self.assertEqual(self.index.stats["rebuilds"], 1)
+
+    def test_unlocated_edit_before_a_hit_moves_its_offset(self):
+        # Paragraph 1 changes length unnoticed while the user types further down
+        self.paragraph(1).text = "Body text of section 0 about topic0, " + "much longer " * 6
+        self.doc.type_in(self.paragraph(30), self.paragraph(30).text)
+        chunk = self.index.search("topic9")[0][1]
+        document = "\n".join(e.text for e in self.doc.Text.elements if isinstance(e, FakeParagraph))
+        self.assertEqual(chunk["start"], document.index("Section 9"))
+        self.assertEqual(self.index.stats["rebuilds"], 1)
+
+    def test_heading_change_rechunks(self):
+        number = self.doc.Text.elements.index(self.paragraph(2))
+        self.paragraph(2).ParaStyleName = "Standard"
+        self.index.mark_paragraph(number)
+        hits = self.index.search("topic1")
+        self.assertEqual(hits[0][1]["first"], number - 2)
+        self.assertEqual(hits[0][1]["last"], number + 1)
+        self.assertEqual(self.index.stats["rebuilds"], 1)
+
+    def test_typing_while_dirty_paragraphs_are_read_is_kept(self):
+        later = self.paragraph(31)
+        interrupt(self.paragraph(25), lambda: self.doc.type_in(later, "Body text of section 15 about topic15 and otters."))
+        self.doc.type_in(self.paragraph(25), "Body text now mentions penguins.")
+        self.index.search("penguins")
+        self.assertIn("otters", self.index.search("otters")[0][1]["text"])
+        self.assertEqual(self.index.stats["rebuilds"], 1)
+
+    def test_typing_during_a_rebuild_is_kept(self):
+        # Paragraph 3 is read before the user types in it, and the rebuild carries on to paragraph 30
+        self.index.mark_stale()
+        interrupt(self.paragraph(30), lambda: self.doc.type_in(self.paragraph(3), "Body text of section 1 about topic1 and otters."))
+        self.index.search("topic12")
+        self.assertIn("otters", self.index.search("otters")[0][1]["text"])
+        self.assertEqual(self.index.stats["rebuilds"], 2)
+
+    def test_without_notifications_every_query_rebuilds(self):
+        self.index.close()
+        self.index.search("topic3")
+        self.assertEqual(self.index.stats["rebuilds"], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
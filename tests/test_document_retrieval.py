@@ -0,0 +1,80 @@
+import unittest
+from extension.tools.document_retrieval import BM25Index, chunk_paragraphs, format_chunks, tokenize
+
+
+def para(index, text, style="Standard"):
+    return {"index": index, "text": text, "style": style}
+
+
+PARAGRAPHS = [
+    para(0, "Budget", "Heading 1"),
+    para(1, "The budget for the project is forty thousand euros."),
+    para(2, "Spending is reviewed every quarter."),
+    para(3, "Schedule", "Heading 1"),
+    para(4, ""),
+    para(5, "The project starts in March and ends in November."),
+    para(6, "Risks", "Heading 1"),
+    para(7, "Supplier delays could push the schedule back."),
+]
+
+
+class TestChunking(unittest.TestCase):
+    def test_headings_start_chunks(self):
+        chunks = chunk_paragraphs(PARAGRAPHS)
+        self.assertEqual([(c["first"], c["last"]) for c in chunks], [(0, 2), (3, 5), (6, 7)])
+        # The blank paragraph is kept so offsets within the chunk line up with the document
+        self.assertEqual(chunks[1]["text"], "Schedule\n\nThe project starts in March and ends in November.")
+
+    def test_chunk_offsets_match_the_document(self):
+        document = "\n".join(p["text"] for p in PARAGRAPHS)
+        starts = {p["index"]: document.index(p["text"]) for p in PARAGRAPHS if p["text"]}
+        for chunk in chunk_paragraphs(PARAGRAPHS):
+            start = starts[chunk["first"]]
+            self.assertEqual(document[start:start + len(chunk["text"])], chunk["text"])
+
+    def test_tables_close_chunks(self):
+        paragraphs = [para(0, "Intro text."), para(1, "", ""), para(2, "More text."), para(3, "")]
+        chunks = chunk_paragraphs(paragraphs, tables={1})
+        self.assertEqual([(c["first"], c["last"], c["text"]) for c in chunks],
+                         [(0, 0, "Intro text."), (2, 2, "More text.")])
+
+    def test_long_sections_are_split(self):
+        paragraphs = [para(0, "Notes", "Heading 2")] + [para(i, "x" * 40) for i in range(1, 6)]
+        chunks = chunk_paragraphs(paragraphs, max_chars=60)
+        self.assertEqual([(c["first"], c["last"]) for c in chunks], [(0, 2), (3, 4), (5, 5)])
+        self.assertEqual(chunks[2]["heading"], "Notes")
+        chunks[2]["start"] = 170
+        self.assertIn('(under "Notes")', format_chunks(chunks[2:]))
+        self.assertTrue(format_chunks(chunks[2:]).startswith("[paragraphs 5, offset 170]"))
+
+
+class TestBM25(unittest.TestCase):
+    def test_ranks_matching_chunk_first(self):
+        index = BM25Index(chunk_paragraphs(PARAGRAPHS))
+        hits = index.search("When does the project start?", k=2)
+        self.assertEqual(hits[0][1]["first"], 3)
+        self.assertEqual(index.search("What are the risks to the schedule?", k=1)[0][1]["first"], 6)
+        self.assertEqual(index.search("budget")[0][1]["first"], 0)
+
+    def test_no_overlap_returns_nothing(self):
+        index = BM25Index(chunk_paragraphs(PARAGRAPHS))
+        self.assertEqual(index.search("penguins"), [])
+        self.assertEqual(index.search("the of and"), [])
+        self.assertEqual(BM25Index([]).search("budget"), [])
+
+    def test_replace_matches_fresh_index(self):
+        chunks = chunk_paragraphs(PARAGRAPHS)
+        index = BM25Index(chunks)
+        edited = dict(chunks[2], text="Risks\nPenguins could eat the budget.")
+        index.replace(2, edited)
+        fresh = BM25Index(chunks[:2] + [edited])
+        self.assertEqual(index.search("penguins budget"), fresh.search("penguins budget"))
+        self.assertEqual(index.doc_freq["supplier"], 0)
+
+    def test_tokenize_drops_stopwords(self):
+        self.assertEqual(tokenize("Make the Budget section bold, please!"), ["budget", "section", "bold"])
+        self.assertEqual(tokenize("starts starting started class"), ["start", "start", "start", "class"])
+
+
+if __name__ == "__main__":
+    unittest.main()
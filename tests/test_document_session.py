@@ -0,0 +1,66 @@
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+from extension.tools import document_session
+
+
+class FakeBroadcaster:
+    def __init__(self):
+        self.listeners = []
+    def addDocumentEventListener(self, listener):
+        self.listeners.append(listener)
+    def removeDocumentEventListener(self, listener):
+        self.listeners.remove(listener)
+    def fire(self, name, source):
+        for listener in list(self.listeners):
+            listener.documentEventOccured(SimpleNamespace(EventName=name, Source=source))
+
+
+class FakeDesktop:
+    def __init__(self, component):
+        self.component = component
+        self.calls = 0
+    def getCurrentComponent(self):
+        self.calls += 1
+        return self.component
+
+
+class FakeServiceManager:
+    def __init__(self, desktop, broadcaster):
+        self.services = {
+            "com.sun.star.frame.Desktop": desktop,
+            "com.sun.star.frame.GlobalEventBroadcaster": broadcaster,
+        }
+    def createInstanceWithContext(self, name, ctx):
+        return self.services[name]
+
+
+class TestDocumentSession(unittest.TestCase):
+    def setUp(self):
+        self.doc = object()
+        self.desktop = FakeDesktop(self.doc)
+        self.broadcaster = FakeBroadcaster()
+        ctx = SimpleNamespace(ServiceManager=FakeServiceManager(self.desktop, self.broadcaster))
+        patcher = mock.patch.object(document_session.uno, "getComponentContext", return_value=ctx, create=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.session = document_session.DocumentSession()
+
+    def test_model_is_resolved_once(self):
+        for _ in range(5):
+            self.assertIs(self.session.get_model(), self.doc)
+        self.assertEqual(self.desktop.calls, 1)
+        self.assertEqual(self.session.stats, {"lookups": 1, "reused": 4})
+
+    def test_tracks_focus_and_unload(self):
+        self.session.get_model()
+        other = object()
+        self.broadcaster.fire("OnFocus", other)
+        self.assertIs(self.session.get_model(), other)
+        self.broadcaster.fire("OnUnload", other)
+        self.assertIs(self.session.get_model(), self.doc)
+        self.assertEqual(self.desktop.calls, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
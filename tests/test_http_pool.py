@@ -0,0 +1,82 @@
+import importlib.util
+import unittest
+from extension.llm_providers import http_pool
+
+
+class FakeClient:
+    def __init__(self, fail=False):
+        self.closed = False
+        self.fail = fail
+    def close(self):
+        self.closed = True
+        if self.fail:
+            raise OSError("connection reset")
+
+
+class FakeAsyncClient:
+    def __init__(self):
+        self.closed = False
+    async def aclose(self):
+        self.closed = True
+
+
+def installed(*modules):
+    return all(importlib.util.find_spec(module) for module in modules)
+
+
+class TestHttpPool(unittest.TestCase):
+    def tearDown(self):
+        http_pool.close_http_clients()
+
+    def test_settings_merge_over_defaults(self):
+        self.assertEqual(http_pool.http_settings({}), http_pool.DEFAULT_HTTP_CONFIG)
+        self.assertEqual(http_pool.http_settings({"http": None}), http_pool.DEFAULT_HTTP_CONFIG)
+        settings = http_pool.http_settings({"http": {"pool_size": 2}})
+        self.assertEqual(settings["pool_size"], 2)
+        self.assertEqual(settings["timeout"], http_pool.DEFAULT_HTTP_CONFIG["timeout"])
+
+    def test_close_closes_every_client_and_clears_the_pool(self):
+        clients = {"httpx": FakeClient(fail=True), "httpx_async": FakeAsyncClient(), "requests": FakeClient()}
+        http_pool._clients.update(clients)
+        # A client failing to close does not stop the others
+        http_pool.close_http_clients()
+        self.assertTrue(all(client.closed for client in clients.values()))
+        self.assertEqual(http_pool._clients, {})
+        http_pool.close_http_clients()
+
+    @unittest.skipUnless(installed("httpx"), "httpx is not installed")
+    def test_httpx_client_is_shared_until_closed(self):
+        config = {"http": {"pool_size": 3, "timeout": 5.0}}
+        client = http_pool.get_http_client(config)
+        self.assertIs(http_pool.get_http_client({}), client)
+        self.assertEqual(client.timeout.read, 5.0)
+        http_pool.close_http_clients()
+        self.assertIsNot(http_pool.get_http_client(config), client)
+
+    @unittest.skipUnless(installed("requests"), "requests is not installed")
+    def test_requests_session_is_shared_until_closed(self):
+        session = http_pool.get_requests_session({"http": {"pool_size": 3}})
+        self.assertIs(http_pool.get_requests_session({}), session)
+        self.assertEqual(session.get_adapter("https://example.com")._pool_maxsize, 3)
+        http_pool.close_http_clients()
+        self.assertIsNot(http_pool.get_requests_session({}), session)
+
+
+@unittest.skipUnless(installed("langchain", "openai", "httpx"), "LangChain, openai or httpx is not installed")
+class TestPooledProviders(unittest.TestCase):
+    def tearDown(self):
+        http_pool.close_http_clients()
+
+    def test_openai_provider_builds_on_the_pools(self):
+        # Built with the real LangChain class, whose async client rejects a synchronous httpx.Client
+        from extension.llm_providers.openai_provider import OpenAIProvider
+        provider = OpenAIProvider({"provider": "openai", "api_key": "sk-test", "endpoint": "http://localhost:9/v1"})
+        self.assertIs(provider.client, provider.tool_client.completions)
+        self.assertIs(provider.tool_client._client, http_pool.get_http_client({}))
+        self.assertIs(provider.async_client._client._client, http_pool.get_async_http_client({}))
+        self.assertEqual(str(provider.tool_client.base_url), "http://localhost:9/v1/")
+        self.assertEqual(provider.tool_client.max_retries, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
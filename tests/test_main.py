@@ -0,0 +1,76 @@
+import threading
+import unittest
+from extension.agent import ToolCallingAgent
+from extension.conversation_manager import ConversationManager, ConversationRenderer
+from extension.main import CANCELLED_REPLY, LibreAIMain, RequestCancelled
+
+
+class StreamingToolProvider:
+    """Native tool-calling provider whose reply streams in as two text chunks and a tool call."""
+    def __init__(self):
+        self.closed = False
+    def supports_native_tools(self):
+        return True
+    def generate_with_tools(self, prompt, tools):
+        return {"content": "Hello", "tool_calls": [{"tool": "set_bold", "args": {"start": 0, "end": 5}}]}
+    def stream_with_tools(self, prompt, tools):
+        try:
+            yield "Hel"
+            yield "lo"
+            yield {"tool": "set_bold", "args": {"start": 0, "end": 5}}
+        finally:
+            self.closed = True
+
+
+def make_main(provider):
+    # The provider is swapped in without reading config.json or loading LangChain
+    main = LibreAIMain.__new__(LibreAIMain)
+    main.provider = provider
+    main.config = {}
+    main.agent = ToolCallingAgent()
+    main.conversation = ConversationManager()
+    main._prompt_renderer = ConversationRenderer(main._render_turn)
+    main._prompt_history = ""
+    return main
+
+
+class TestNextStep(unittest.TestCase):
+    def test_native_tool_reply_streams_text(self):
+        main = make_main(StreamingToolProvider())
+        tokens = []
+        reply = main._next_step("User: bold hello\nAI:", [], tokens.append, None)
+        self.assertEqual(tokens, ["Hel", "lo"])
+        self.assertEqual(reply, {"content": "Hello", "tool_calls": [{"tool": "set_bold", "args": {"start": 0, "end": 5}}]})
+
+    def test_native_tool_reply_can_be_cancelled(self):
+        provider = StreamingToolProvider()
+        main = make_main(provider)
+        cancel_event = threading.Event()
+        tokens = []
+        def on_token(chunk):
+            tokens.append(chunk)
+            cancel_event.set()
+        with self.assertRaises(RequestCancelled):
+            main._next_step("User: bold hello\nAI:", [], on_token, cancel_event)
+        self.assertEqual(tokens, ["Hel"])
+        self.assertTrue(provider.closed)
+
+    def test_without_streaming_the_reply_comes_whole(self):
+        main = make_main(StreamingToolProvider())
+        self.assertEqual(main._next_step("User: bold hello\nAI:", [], None, None)["content"], "Hello")
+
+
+class TestCancellation(unittest.TestCase):
+    def test_cancelled_request_is_recorded(self):
+        main = make_main(StreamingToolProvider())
+        cancel_event = threading.Event()
+        cancel_event.set()
+        with self.assertRaises(RequestCancelled):
+            main.process_user_request("bold hello", on_token=lambda chunk: None, cancel_event=cancel_event)
+        history = main.conversation.get_history()
+        self.assertEqual([m["role"] for m in history], ["user", "ai"])
+        self.assertEqual(history[-1]["content"], CANCELLED_REPLY)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import asyncio
+import threading
+import time
+import unittest
+from extension.llm_providers.base import LLMProviderBase
+
+
+class SlowEchoProvider(LLMProviderBase):
+    def __init__(self, config, delay=0.05):
+        LLMProviderBase.__init__(self, config)
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+    async def _agenerate_text(self, prompt, **kwargs):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.delay)
+        self.in_flight -= 1
+        return prompt.upper()
+
+
+class BlockingEchoProvider(LLMProviderBase):
+    def __init__(self, config):
+        LLMProviderBase.__init__(self, config)
+        self.calls = 0
+    def _generate_text(self, prompt, **kwargs):
+        self.calls += 1
+        time.sleep(0.05)
+        return prompt.upper()
+
+
+class RendezvousEchoProvider(BlockingEchoProvider):
+    def __init__(self, config, parties):
+        BlockingEchoProvider.__init__(self, config)
+        self.barrier = threading.Barrier(parties, timeout=5)
+    def _generate_text(self, prompt, **kwargs):
+        self.barrier.wait()
+        return BlockingEchoProvider._generate_text(self, prompt, **kwargs)
+
+
+class TestProviderAsync(unittest.TestCase):
+    def test_batch_preserves_order(self):
+        provider = SlowEchoProvider({"provider": "echo", "cache": {"enabled": False}})
+        self.assertEqual(provider.generate_batch(["a", "b", "c"]), ["A", "B", "C"])
+
+    def test_batch_respects_max_concurrency(self):
+        provider = SlowEchoProvider({"provider": "echo", "cache": {"enabled": False}, "max_concurrency": 2})
+        provider.generate_batch([str(i) for i in range(6)])
+        self.assertEqual(provider.max_in_flight, 2)
+        provider.max_in_flight = 0
+        provider.generate_batch([str(i) for i in range(6)], max_concurrency=3)
+        self.assertEqual(provider.max_in_flight, 3)
+
+    def test_blocking_provider_runs_concurrently(self):
+        provider = RendezvousEchoProvider({"provider": "echo", "cache": {"enabled": False}}, parties=4)
+        # Each call waits for the other three; run one after another, the first would time out
+        self.assertEqual(provider.generate_batch(["a", "b", "c", "d"]), ["A", "B", "C", "D"])
+        self.assertEqual(provider.calls, 4)
+
+    def test_async_shares_response_cache(self):
+        provider = BlockingEchoProvider({"provider": "echo", "cache": {"enabled": True, "max_entries": 8}, "model_name": "async-cache-test"})
+        first = provider.generate("shared prompt")
+        self.assertEqual(asyncio.run(provider.generate_async("shared prompt")), first)
+        self.assertEqual(provider.calls, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,25 @@
+import subprocess
+import sys
+import unittest
+from extension.llm_providers import provider_factory
+
+
+class TestProviderFactory(unittest.TestCase):
+    def test_import_loads_no_provider_modules(self):
+        # In a fresh interpreter, so modules imported by other tests do not count
+        code = (
+            "import sys\n"
+            "from extension.llm_providers import provider_factory\n"
+            "names = ['extension.llm_providers' + m for m, _ in provider_factory.PROVIDER_REGISTRY.values()]\n"
+            "print(','.join(m for m in names + ['langchain'] if m in sys.modules))\n"
+        )
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), "")
+
+    def test_unknown_provider(self):
+        with self.assertRaises(ValueError):
+            provider_factory.get_provider_from_config({"provider": "nope"})
+
+
+if __name__ == '__main__':
+    unittest.main()
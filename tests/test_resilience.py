@@ -0,0 +1,110 @@
+import unittest
+from unittest import mock
+from extension.config import get_rate_limit
+from extension.llm_providers import resilience
+from extension.llm_providers.resilience import (
+    TokenBucket, backoff_delay, call_with_retry, get_rate_limiter, is_retryable, retry_after, stream_with_retry)
+
+NO_WAIT = {"provider": "echo", "retry": {"max_retries": 3, "base_delay": 0.0, "max_delay": 0.0, "jitter": 0.0}}
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class HTTPError(Exception):
+    def __init__(self, status_code, headers=None):
+        Exception.__init__(self, f"HTTP {status_code}")
+        self.response = FakeResponse(status_code, headers)
+
+
+class FlakyCall:
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.calls = 0
+    def __call__(self, prompt):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return prompt.upper()
+
+
+class TestRetry(unittest.TestCase):
+    def test_retries_transient_errors(self):
+        call = FlakyCall([HTTPError(429), HTTPError(503)])
+        self.assertEqual(call_with_retry(call, NO_WAIT, "hi"), "HI")
+        self.assertEqual(call.calls, 3)
+
+    def test_client_errors_are_not_retried(self):
+        call = FlakyCall([HTTPError(400)])
+        with self.assertRaises(HTTPError):
+            call_with_retry(call, NO_WAIT, "hi")
+        self.assertEqual(call.calls, 1)
+
+    def test_gives_up_after_max_retries(self):
+        call = FlakyCall([HTTPError(500)] * 5)
+        with self.assertRaises(HTTPError):
+            call_with_retry(call, NO_WAIT, "hi")
+        self.assertEqual(call.calls, 4)
+
+    def test_retryable_classification(self):
+        self.assertTrue(is_retryable(ConnectionError()))
+        self.assertTrue(is_retryable(type("APITimeoutError", (Exception,), {})()))
+        self.assertFalse(is_retryable(ValueError("bad prompt")))
+
+    def test_retry_after_header(self):
+        self.assertEqual(retry_after(HTTPError(429, {"retry-after": "7"})), 7.0)
+        self.assertEqual(retry_after(HTTPError(429, {"retry-after-ms": "250"})), 0.25)
+        self.assertIsNone(retry_after(HTTPError(429)))
+        settings = {"base_delay": 1.0, "max_delay": 30.0, "jitter": 0.5}
+        self.assertEqual(backoff_delay(0, settings, HTTPError(429, {"retry-after": "7"})), 7.0)
+        # Exponential backoff with up to 50% jitter, capped at max_delay
+        self.assertTrue(4.0 <= backoff_delay(2, settings, HTTPError(503)) <= 6.0)
+        self.assertEqual(backoff_delay(10, settings), 30.0)
+        # Retry-After is honoured as given, not shortened to max_delay
+        self.assertEqual(backoff_delay(0, {**settings, "max_delay": 7.0}, HTTPError(429, {"retry-after": "7"})), 7.0)
+        self.assertIsNone(backoff_delay(0, settings, HTTPError(429, {"retry-after": "120"})))
+
+    def test_long_retry_after_is_not_retried(self):
+        call = FlakyCall([HTTPError(429, {"retry-after": "3600"})])
+        with self.assertRaises(HTTPError):
+            call_with_retry(call, NO_WAIT, "hi")
+        self.assertEqual(call.calls, 1)
+
+    def test_stream_retries_only_before_first_chunk(self):
+        attempts = []
+        def stream(prompt):
+            attempts.append(prompt)
+            if len(attempts) == 1:
+                raise HTTPError(429)
+            yield "a"
+            raise HTTPError(503)
+        with self.assertRaises(HTTPError):
+            list(stream_with_retry(stream, NO_WAIT, "hi"))
+        self.assertEqual(len(attempts), 2)
+
+
+class TestRateLimit(unittest.TestCase):
+    def test_bucket_allows_burst_then_queues(self):
+        clock = [100.0]
+        with mock.patch.object(resilience.time, "monotonic", lambda: clock[0]):
+            bucket = TokenBucket(requests_per_minute=60, burst=2)
+            self.assertEqual(bucket.reserve(), 0.0)
+            self.assertEqual(bucket.reserve(), 0.0)
+            self.assertAlmostEqual(bucket.reserve(), 1.0)
+            self.assertAlmostEqual(bucket.reserve(), 2.0)
+            clock[0] += 10
+            self.assertEqual(bucket.reserve(), 0.0)
+
+    def test_limits_are_configured_per_provider(self):
+        self.assertIsNone(get_rate_limiter({"provider": "ollama"}))
+        config = {"provider": "openai", "rate_limits": {"openai": {"requests_per_minute": 120}}}
+        self.assertEqual(get_rate_limit(config)["requests_per_minute"], 120)
+        self.assertIs(get_rate_limiter(config), get_rate_limiter(dict(config)))
+        self.assertIsNot(get_rate_limiter(config), get_rate_limiter({"provider": "anthropic"}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import os
+import tempfile
+import unittest
+from extension.llm_providers.base import LLMProviderBase
+from extension.llm_providers.response_cache import ResponseCache, get_response_cache
+
+
+class EchoProvider(LLMProviderBase):
+    def __init__(self, config):
+        LLMProviderBase.__init__(self, config)
+        self.calls = 0
+    def _generate_text(self, prompt, **kwargs):
+        self.calls += 1
+        return prompt.upper()
+
+
+class TestResponseCache(unittest.TestCase):
+    def test_lru_eviction(self):
+        cache = ResponseCache(max_entries=2)
+        cache.put("a", "1")
+        cache.put("b", "2")
+        cache.get("a")
+        cache.put("c", "3")
+        self.assertEqual(cache.get("a"), "1")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), "3")
+
+    def test_key_depends_on_params(self):
+        key = ResponseCache.make_key("OpenAIProvider", "gpt", {"temperature": 0}, "hi")
+        self.assertEqual(key, ResponseCache.make_key("OpenAIProvider", "gpt", {"temperature": 0}, "hi"))
+        self.assertNotEqual(key, ResponseCache.make_key("OpenAIProvider", "gpt", {"temperature": 1}, "hi"))
+        self.assertNotEqual(key, ResponseCache.make_key("AnthropicProvider", "gpt", {"temperature": 0}, "hi"))
+
+    def test_disk_persistence(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            ResponseCache(cache_dir=cache_dir).put("abcdef", "stored")
+            self.assertEqual(ResponseCache(cache_dir=cache_dir).get("abcdef"), "stored")
+
+    def test_disk_store_is_bounded(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = ResponseCache(cache_dir=cache_dir, max_disk_entries=3)
+            for i, key in enumerate(["aa1", "bb2", "cc3"]):
+                cache.put(key, key)
+                os.utime(cache._path(key), (1000 + i, 1000 + i))
+            # A hit makes aa1 the most recently used file
+            self.assertEqual(ResponseCache(cache_dir=cache_dir).get("aa1"), "aa1")
+            cache.put("dd4", "dd4")
+            self.assertEqual(len(cache._files()), 3)
+            self.assertFalse(os.path.exists(cache._path("bb2")))
+            self.assertTrue(os.path.exists(cache._path("aa1")))
+
+    def test_clear_removes_files(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = ResponseCache(cache_dir=cache_dir)
+            cache.put("abcdef", "stored")
+            cache.clear()
+            self.assertIsNone(cache.get("abcdef"))
+            self.assertEqual(cache._files(), [])
+
+    def test_disabled_by_default(self):
+        self.assertIsNone(get_response_cache({}))
+        self.assertIsNone(get_response_cache({"cache": {"enabled": False}}))
+        self.assertIsNotNone(get_response_cache({"cache": {"enabled": True}}))
+
+
+class TestProviderCaching(unittest.TestCase):
+    def test_generate_uses_cache_unless_bypassed(self):
+        provider = EchoProvider({"model_name": "echo-cache-test", "cache": {"enabled": True, "max_entries": 7}})
+        self.assertEqual(provider.generate("hello"), "HELLO")
+        self.assertEqual(provider.generate("hello"), "HELLO")
+        self.assertEqual(provider.calls, 1)
+        provider.generate("hello", use_cache=False)
+        self.assertEqual(provider.calls, 2)
+        self.assertEqual(list(provider.generate_stream("hello")), ["HELLO"])
+        self.assertEqual(provider.calls, 2)
+
+    def test_generate_calls_model_when_cache_not_enabled(self):
+        provider = EchoProvider({"model_name": "echo-cache-test"})
+        provider.generate("hello")
+        provider.generate("hello")
+        self.assertEqual(provider.calls, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
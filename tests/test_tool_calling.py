@@ -0,0 +1,129 @@
+import types
+import unittest
+from typing import List, Optional
+from unittest import mock
+from extension import agentic_tools
+from extension.llm_providers.base import LLMProviderBase
+from extension.llm_providers.tool_calling import anthropic_tools, openai_tools, parse_tool_calls, tool_instructions
+
+
+def set_bold(start: int, end: int, bold: bool = True) -> bool:
+    """Set or unset bold formatting for the specified text range."""
+    return True
+
+def insert_bullet_list(items, position = None) -> bool:
+    return True
+
+def insert_table(rows: int, columns: int, position: Optional[int] = None,
+                 data: Optional[List[List[str]]] = None) -> bool:
+    return True
+
+FAKE_TOOLS = types.SimpleNamespace(set_bold=set_bold, insert_bullet_list=insert_bullet_list, insert_table=insert_table)
+
+
+class ScriptedProvider(LLMProviderBase):
+    def __init__(self, reply):
+        LLMProviderBase.__init__(self, {"provider": "echo"})
+        self.reply = reply
+        self.prompts = []
+    def _generate_text(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        return self.reply
+
+
+class TestParseToolCalls(unittest.TestCase):
+    def test_plain_text_is_content(self):
+        self.assertEqual(parse_tool_calls("Sure, here you go."), {"content": "Sure, here you go.", "tool_calls": []})
+        self.assertEqual(parse_tool_calls("[1, 2]")["tool_calls"], [])
+        self.assertEqual(parse_tool_calls("{not json")["tool_calls"], [])
+
+    def test_single_and_multiple_calls(self):
+        single = parse_tool_calls('{"tool": "set_bold", "args": {"start": 0, "end": 4}}')
+        self.assertEqual(single["tool_calls"], [{"tool": "set_bold", "args": {"start": 0, "end": 4}}])
+        fenced = parse_tool_calls('```json\n[{"tool": "undo_last_action"}, {"tool": "set_italic", "args": {"start": 1, "end": 2}}]\n```')
+        self.assertEqual([c["tool"] for c in fenced["tool_calls"]], ["undo_last_action", "set_italic"])
+        self.assertEqual(fenced["tool_calls"][0]["args"], {})
+        wrapped = parse_tool_calls('{"tool_calls": [{"tool": "count_words"}]}')
+        self.assertEqual(wrapped["tool_calls"], [{"tool": "count_words", "args": {}}])
+
+
+class TestSelectTools(unittest.TestCase):
+    def test_relevant_groups_and_core_tools(self):
+        names = agentic_tools.select_tools("Make the introduction bold and italic")
+        self.assertIn("set_bold", names)
+        self.assertIn("find_text", names)
+        self.assertNotIn("insert_table", names)
+        self.assertEqual(names, [n for n in agentic_tools.TOOL_FUNCTIONS if n in names])
+        self.assertIn("set_table_cell_text", agentic_tools.select_tools("Fill in the second table's cells"))
+
+    def test_keywords_match_whole_words(self):
+        # Inflections count, but words that merely start with a keyword do not
+        self.assertIn("insert_heading", agentic_tools.select_tools("Add headings for each part"))
+        self.assertIn("move_cursor_to_position", agentic_tools.select_tools("Try moving it down"))
+        self.assertNotIn("insert_table", agentic_tools.select_tools("Bold the cellar entry"))
+        names = agentic_tools.select_tools("Bold the address and the listener's name")
+        self.assertIn("set_bold", names)
+        self.assertNotIn("insert_text_at_cursor", names)
+        self.assertNotIn("insert_bullet_list", names)
+
+    def test_unmatched_request_gets_every_tool(self):
+        self.assertEqual(agentic_tools.select_tools("Hmm?"), agentic_tools.TOOL_FUNCTIONS)
+
+    def test_groups_only_name_registered_tools(self):
+        for keywords, names in agentic_tools.TOOL_GROUPS.values():
+            self.assertTrue(set(names) <= set(agentic_tools.TOOL_FUNCTIONS))
+
+
+class TestToolSchemas(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(agentic_tools, "_document_tools", lambda: FAKE_TOOLS)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(agentic_tools.TOOL_REGISTRY._schemas.clear)
+
+    def test_schema_from_signature(self):
+        schema = agentic_tools.tool_schemas(["set_bold"])[0]
+        self.assertEqual(schema["name"], "set_bold")
+        self.assertEqual(schema["description"], "Set or unset bold formatting for the specified text range.")
+        self.assertEqual(schema["parameters"]["properties"],
+                         {"start": {"type": "integer"}, "end": {"type": "integer"}, "bold": {"type": "boolean"}})
+        self.assertEqual(schema["parameters"]["required"], ["start", "end"])
+        untyped = agentic_tools.TOOL_REGISTRY.schema("insert_bullet_list")
+        # Unannotated parameters are typed by name rather than left as {}
+        self.assertEqual(untyped["parameters"]["properties"], {"items": {"type": "array"}, "position": {"type": "integer"}})
+        self.assertEqual(untyped["description"], "Insert bullet list.")
+        self.assertEqual(untyped["parameters"]["required"], ["items"])
+
+    def test_optional_and_nested_annotations(self):
+        properties = agentic_tools.TOOL_REGISTRY.schema("insert_table")["parameters"]["properties"]
+        self.assertEqual(properties["position"], {"type": "integer"})
+        self.assertEqual(properties["data"], {"type": "array", "items": {"type": "array", "items": {"type": "string"}}})
+
+    def test_instructions_rendered_once(self):
+        schemas = agentic_tools.tool_schemas(["set_bold"])
+        self.assertIs(tool_instructions(schemas), tool_instructions(agentic_tools.tool_schemas(["set_bold"])))
+        self.assertNotEqual(tool_instructions(schemas), tool_instructions(agentic_tools.tool_schemas(["insert_bullet_list"])))
+
+    def test_provider_formats(self):
+        schemas = agentic_tools.tool_schemas(["set_bold"])
+        self.assertEqual(openai_tools(schemas)[0]["function"]["name"], "set_bold")
+        self.assertEqual(anthropic_tools(schemas)[0]["input_schema"], schemas[0]["parameters"])
+
+    def test_prompted_fallback(self):
+        provider = ScriptedProvider('[{"tool": "set_bold", "args": {"start": 0, "end": 3}}, '
+                                    '{"tool": "set_bold", "args": {"start": 5, "end": 8}}]')
+        reply = provider.generate_with_tools("User: bold both words\nAI:", agentic_tools.tool_schemas(["set_bold"]))
+        self.assertEqual(len(reply["tool_calls"]), 2)
+        self.assertIn('"name":"set_bold"', provider.prompts[0])
+        self.assertTrue(provider.prompts[0].endswith("AI:"))
+
+    def test_stream_with_tools_yields_text_then_calls(self):
+        provider = ScriptedProvider('[{"tool": "set_bold", "args": {"start": 0, "end": 3}}]')
+        items = list(provider.stream_with_tools("User: bold it\nAI:", agentic_tools.tool_schemas(["set_bold"])))
+        self.assertEqual(items, [{"tool": "set_bold", "args": {"start": 0, "end": 3}}])
+        provider.reply = "Nothing to change."
+        self.assertEqual(list(provider.stream_with_tools("User: hi\nAI:", [])), ["Nothing to change."])
+
+
+if __name__ == "__main__":
+    unittest.main()